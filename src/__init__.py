@@ -1,3 +1,23 @@
 from .common import *
-from .nlp import *
 from .object import *
+
+
+def __getattr__(name):
+    from . import common
+
+    # attributes of src.common that are loaded on first use (e.g. ALL_CHARACTERS)
+    if not name.startswith('_'):
+        try:
+            return getattr(common, name)
+        except AttributeError:
+            pass
+
+    # src.nlp imports NetworkX, SciPy and pandas, so it is only imported when one of its names is used
+    import importlib
+
+    nlp = importlib.import_module('.nlp', __name__)
+    if name == 'nlp':
+        return nlp
+    if name.startswith('_') or not hasattr(nlp, name):
+        raise AttributeError("module '{}' has no attribute '{}'".format(__name__, name))
+    return getattr(nlp, name)
@@ -1,4 +1,11 @@
 from .book_io import *
+from .build_cache import *
 from .character_loader import *
 from .constants import *
 from .parser import *
+from .profiling import *
+
+
+def __getattr__(name):
+    # attributes of character_loader that are loaded on first use (e.g. ALL_CHARACTERS)
+    return getattr(character_loader, name)
@@ -1,12 +1,19 @@
 import gzip
 import json
+import mmap
 import os
+import struct
+import sys
+from array import array
 
 from pathlib import Path
 
 from src.common import constants
 from src.object import Book, book_to_dict, book_from_dict
 
+# first bytes of every binary interim file
+BINARY_MAGIC = b'EXPBOOK1'
+
 
 def load_book_titles() -> list:
     """
@@ -19,21 +26,20 @@ def load_book_titles() -> list:
     return [book.strip('\n\r') for book in books]
 
 
-def load_books(novels_only: bool = False) -> list:
+def load_books(novels_only: bool = False, lazy: bool = False) -> list:
     """
-    Load books either from a compressed .json.gz file in {PROJECT_DIR}/data/interim (create files with make_dataset.py)
-    or parses books from {PROJECT_DIR}/data/raw .txt files
+    Load books either from an interim file (.json.gz or .bin) in {PROJECT_DIR}/data/interim
+    (create files with make_dataset.py) or parses books from {PROJECT_DIR}/data/raw .txt files
 
     :param novels_only: True: only novels will be loaded, False: will also load novellas
+    :param lazy: read the lines of books in the binary format only when they are accessed
     :return: list of Book objects
     """
     books = []
-    for (dir_path, _, filenames) in os.walk(constants.INTERIM_DATA_DIR):
-        filenames = [name for name in filenames if name.endswith('.json.gz')]
-        for filename in filenames:
-            book = load_compressed(Path(dir_path) / filename)
-            if not novels_only or book.is_novel():
-                books.append(book)
+    for file in interim_files():
+        book = load_interim(file, lazy)
+        if not novels_only or book.is_novel():
+            books.append(book)
 
     books = load_missing_books_from_raw(novels_only, books)
 
@@ -48,15 +54,13 @@ def load_missing_books_from_raw(novels_only: bool, found_books: list):
     :param found_books: list of books already loaded
     :return: list of missing books
     """
-    from src.common.parser import book_name_from_path, book_number_from_path, parse_book
+    from src.common.parser import book_files, book_number_from_path, parse_book
 
     titles = [book.title for book in found_books]
-    for (dir_path, _, filenames) in os.walk(constants.RAW_DATA_DIR):
-        if len(filenames) > 0:
-            book_title = book_name_from_path(dir_path)
-            book_number = book_number_from_path(dir_path)
-            if (not novels_only or book_number % 1 == 0) and book_title not in titles:
-                found_books.append(parse_book(book_title))
+    for (book_title, file) in book_files().items():
+        book_number = book_number_from_path(str(file.parent))
+        if (not novels_only or book_number % 1 == 0) and book_title not in titles:
+            found_books.append(parse_book(book_title))
 
     return found_books
 
@@ -75,17 +79,82 @@ def load_book_by_nr(number: int) -> Book:
     return load_book(books[number - 1])
 
 
-def load_book(title: str) -> Book:
+def load_book(title: str, lazy: bool = False) -> Book:
     """
     Loads a book by its title as Book object.
 
+    The interim file in the configured INTERIM_FORMAT is used if it exists, any other interim file otherwise.
+
     :param title: title of the book
+    :param lazy: read the lines only when they are accessed (binary format only, see `load_binary_lazy`)
     :return: Book
     """
-    file = constants.INTERIM_DATA_DIR / '{}.json.gz'.format(title)
+    if lazy and interim_file(title, 'binary').exists():
+        return load_binary_lazy(interim_file(title, 'binary'))
+
+    file = interim_file(title)
+    if not file.exists():
+        file = next((f for f in map(lambda fmt: interim_file(title, fmt), constants.INTERIM_FILE_EXTENSIONS)
+                     if f.exists()), file)
+    return load_interim(file, lazy)
+
+
+def interim_file(title: str, interim_format: str = None) -> Path:
+    """
+    :param title: title of the book
+    :param interim_format: 'json' or 'binary' (default: INTERIM_FORMAT)
+    :return: path of the interim file of the book in the given format
+    """
+    extension = constants.INTERIM_FILE_EXTENSIONS[interim_format or constants.INTERIM_FORMAT]
+    return constants.INTERIM_DATA_DIR / '{}{}'.format(title, extension)
+
+
+def interim_files(all_formats: bool = False) -> list:
+    """
+    Lists the interim files of all books in {PROJECT_DIR}/data/interim.
+    If a book was saved in several formats, the file in the configured INTERIM_FORMAT is used.
+
+    :param all_formats: list the files of every format instead
+    :return: list of file paths
+    """
+    preferred = constants.INTERIM_FILE_EXTENSIONS[constants.INTERIM_FORMAT]
+    files = dict()
+    for (dir_path, _, filenames) in os.walk(constants.INTERIM_DATA_DIR):
+        for filename in sorted(filenames):
+            for extension in constants.INTERIM_FILE_EXTENSIONS.values():
+                title = filename[:-len(extension)] if not all_formats else filename
+                if filename.endswith(extension) and (title not in files or extension == preferred):
+                    files[title] = Path(dir_path) / filename
+
+    return list(files.values())
+
+
+def load_interim(file: Path, lazy: bool = False) -> Book:
+    """
+    Loads a Book object from an interim file of any format.
+
+    :param file: path to a .json.gz or .bin file
+    :param lazy: read the lines of a .bin file only when they are accessed
+    :return: Book object
+    """
+    if str(file).endswith(constants.INTERIM_FILE_EXTENSIONS['binary']):
+        return load_binary_lazy(file) if lazy else load_binary(file)
     return load_compressed(file)
 
 
+def save_interim(book: Book, with_tokens: bool = constants.INTERIM_TOKENS):
+    """
+    Saves a Book object as interim file in the configured INTERIM_FORMAT.
+
+    :param book: book to save
+    :param with_tokens: also save the tokenized words of the book
+    """
+    if constants.INTERIM_FORMAT == 'binary':
+        save_binary(book, with_tokens)
+    else:
+        save_compressed(book, with_tokens)
+
+
 def load_compressed(file: Path) -> Book:
     """
     Loads a json string out of a .json.gz file and creates a valid Book object.
@@ -96,17 +165,223 @@ def load_compressed(file: Path) -> Book:
     with gzip.GzipFile(file, 'rb', compresslevel=constants.JSON_COMPRESS_LVL) as f_in:
         json_str = f_in.read().decode('utf-8')
 
-    return json.loads(json_str, object_hook=book_from_dict)
+    # book_from_dict converts the nested chapter and segment dicts itself
+    return book_from_dict(json.loads(json_str))
 
 
-def save_compressed(book: Book):
+def save_compressed(book: Book, with_tokens: bool = constants.INTERIM_TOKENS):
     """
     Saves a Book object into a json string and saves it in a compressed .json.gz file.
 
     :param book: book to save
+    :param with_tokens: also save the tokenized words of the book, which are used by `load_compressed`
+                        instead of parsing the lines again
     """
-    json_str = json.dumps(book_to_dict(book))
+    json_str = json.dumps(book_to_dict(book, with_tokens))
     file = constants.INTERIM_DATA_DIR / '{}.json.gz'.format(book.title)
 
     with gzip.GzipFile(file, 'wb', compresslevel=constants.JSON_COMPRESS_LVL) as f_out:
         f_out.write(json_str.encode('utf-8'))
+
+
+def _array_to_bytes(values: array) -> bytes:
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values.tobytes()
+
+
+def _array_from_bytes(typecode: str, data) -> array:
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values
+
+
+def _read_blocks(data) -> list:
+    """
+    Splits the content of a binary interim file into its blocks.
+
+    :param data: bytes-like content of the file
+    :return: list of memoryviews
+    """
+    data = memoryview(data)
+    if data[:len(BINARY_MAGIC)] != BINARY_MAGIC:
+        raise ValueError('not a binary interim file')
+    pos = len(BINARY_MAGIC)
+    (count,) = struct.unpack_from('<I', data, pos)
+    pos += 4
+    blocks = []
+    for _ in range(count):
+        (length,) = struct.unpack_from('<Q', data, pos)
+        pos += 8
+        blocks.append(data[pos:pos + length])
+        pos += length
+
+    return blocks
+
+
+def save_binary(book: Book, with_tokens: bool = constants.INTERIM_TOKENS):
+    """
+    Saves a Book object in the binary interim format (.bin).
+
+    The file consists of length-prefixed blocks:
+     * a json header with the book, chapter and segment attributes (without the lines)
+     * the byte offset of every line in the text block
+     * all lines as one contiguous UTF-8 text block
+     * (optional) the token ids and segment offsets of the TokenStream; the vocabulary is part of the header
+
+    :param book: book to save
+    :param with_tokens: also save the tokenized words of the book
+    """
+    from src.object.TokenStream import TokenStream
+
+    lines = []
+    header = book_to_dict(Book(book.title, book.number, []))
+    for chapter in book.chapters:
+        segments = []
+        for segment in chapter.segments:
+            segments.append({'no': segment.number,
+                             'lines': [len(lines), len(lines) + len(segment.lines)],
+                             'characters': segment.characters})
+            lines.extend(segment.lines)
+        header['chapters'].append({'no': chapter.number,
+                                   'pov': chapter.pov.ref_name,
+                                   'segments': segments,
+                                   'chapter_type': chapter.chapter_type.name})
+
+    encoded = [line.encode('utf-8') for line in lines]
+    offsets = array('Q', [0])
+    for line in encoded:
+        offsets.append(offsets[-1] + len(line))
+
+    blocks = [None, _array_to_bytes(offsets), b''.join(encoded)]
+    if with_tokens:
+        stream = TokenStream.from_book(book)
+        header['vocabulary'] = stream.vocabulary
+        blocks += [_array_to_bytes(array('I', stream.ids)), _array_to_bytes(array('Q', stream.offsets))]
+    blocks[0] = json.dumps(header).encode('utf-8')
+
+    file = interim_file(book.title, 'binary')
+    with open(file, 'wb') as f_out:
+        f_out.write(BINARY_MAGIC)
+        f_out.write(struct.pack('<I', len(blocks)))
+        for block in blocks:
+            f_out.write(struct.pack('<Q', len(block)))
+            f_out.write(block)
+
+
+def load_binary(file: Path) -> Book:
+    """
+    Loads a Book object from a binary interim file (see `save_binary`).
+
+    :param file: path to .bin file
+    :return: Book object
+    """
+    with open(file, 'rb') as f_in:
+        blocks = _read_blocks(f_in.read())
+
+    header = json.loads(bytes(blocks[0]))
+    offsets = _array_from_bytes('Q', blocks[1])
+    text = blocks[2]
+    lines = [str(text[offsets[i]:offsets[i + 1]], 'utf-8') for i in range(len(offsets) - 1)]
+    for chapter in header['chapters']:
+        for segment in chapter['segments']:
+            start, end = segment['lines']
+            segment['lines'] = lines[start:end]
+    if len(blocks) > 3:
+        header['tokens'] = {'vocabulary': header.pop('vocabulary'),
+                            'ids': _array_from_bytes('I', blocks[3]),
+                            'offsets': _array_from_bytes('Q', blocks[4])}
+
+    return book_from_dict(header)
+
+
+class BinaryBookFile:
+    """
+    Memory-mapped binary interim file (see `save_binary`).
+    Only the json header is parsed when the file is opened, lines are read on demand.
+    """
+
+    def __init__(self, file: Path):
+        """
+        :param file: path to .bin file
+        """
+        with open(file, 'rb') as f_in:
+            self._map = mmap.mmap(f_in.fileno(), 0, access=mmap.ACCESS_READ)
+        self.blocks = _read_blocks(self._map)
+        self.header = json.loads(bytes(self.blocks[0]))
+
+    def lines(self, start: int, end: int) -> list:
+        """
+        :param start: index of the first line
+        :param end: index after the last line
+        :return: the requested lines
+        """
+        offsets = struct.unpack_from('<{}Q'.format(end - start + 1), self.blocks[1], start * 8)
+        text = self.blocks[2]
+        return [str(text[offsets[i]:offsets[i + 1]], 'utf-8') for i in range(end - start)]
+
+    def token_stream(self):
+        """
+        :return: TokenStream that reads the token ids directly from the file or None if the file has no tokens
+        """
+        from src.object.TokenStream import TokenStream
+
+        if len(self.blocks) <= 3:
+            return None
+        if sys.byteorder == 'big':
+            ids, offsets = _array_from_bytes('I', self.blocks[3]), _array_from_bytes('Q', self.blocks[4])
+        else:
+            ids, offsets = self.blocks[3].cast('I'), self.blocks[4].cast('Q')
+        return TokenStream(self.header['vocabulary'], ids, offsets)
+
+
+def load_binary_lazy(file: Path) -> Book:
+    """
+    Loads a Book object from a binary interim file without reading its lines.
+
+    Chapters, POV characters and segments are available right away, the lines of a segment are read from the
+    memory-mapped file when they are accessed for the first time.
+
+    :param file: path to .bin file
+    :return: Book object
+    """
+    from src.common.character_loader import find_character_for_pov
+    from src.object import Chapter, ChapterType, LazySegment
+
+    book_file = BinaryBookFile(file)
+    header = book_file.header
+    chapters = []
+    for chapter in header['chapters']:
+        segments = [LazySegment(s['no'], book_file, s['lines'][0], s['lines'][1], s['characters'])
+                    for s in chapter['segments']]
+        chapters.append(Chapter(chapter['no'], find_character_for_pov(chapter['pov']), segments,
+                                ChapterType.parse(chapter['chapter_type'])))
+
+    book = Book(header['title'], header['number'], chapters)
+    stream = book_file.token_stream()
+    if stream:
+        stream.attach(book)
+    return book
+
+
+def convert_interim_files(interim_format: str, with_tokens: bool = constants.INTERIM_TOKENS) -> list:
+    """
+    Converts all interim files in {PROJECT_DIR}/data/interim into the given format.
+    The original files are kept.
+
+    :param interim_format: 'json' or 'binary'
+    :param with_tokens: also save the tokenized words of the books
+    :return: list of the written files
+    """
+    save = save_binary if interim_format == 'binary' else save_compressed
+    extension = constants.INTERIM_FILE_EXTENSIONS[interim_format]
+    written = []
+    for file in interim_files():
+        if not str(file).endswith(extension):
+            book = load_interim(file)
+            save(book, with_tokens)
+            written.append(interim_file(book.title, interim_format))
+
+    return written
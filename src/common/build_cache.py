@@ -0,0 +1,131 @@
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+
+from src.common import constants
+
+
+def content_hash(*parts) -> str:
+    """
+    Hashes any number of strings or bytes (other values are converted to strings).
+
+    :param parts: strings or bytes
+    :return: sha1 hex digest of all parts
+    """
+    sha1 = hashlib.sha1()
+    for part in parts:
+        sha1.update(part if isinstance(part, bytes) else str(part).encode('utf-8'))
+        sha1.update(b'\0')
+    return sha1.hexdigest()
+
+
+def book_hash(book) -> str:
+    """
+    Hashes the parsed content of a book.
+    Any change to the book text (raw 'book.txt' or interim file) changes the hash.
+
+    :param book: Book object
+    :return: sha1 hex digest
+    """
+    parts = [book.title, book.number]
+    for chapter in book.chapters:
+        parts += [chapter.number, chapter.pov.ref_name, chapter.chapter_type.name]
+        for segment in chapter.segments:
+            parts += [segment.number, segment.content()]
+    return content_hash(*parts)
+
+
+def character_files_hash(book: str) -> str:
+    """
+    Hashes the names and aliases of all character files in {PROJECT_DIR}/references/characters/{book}.
+
+    :param book: name of the book
+    :return: sha1 hex digest
+    """
+    book_dir = constants.REFERENCES_DIR / 'characters' / book
+    parts = []
+    if book_dir.exists():
+        for filename in sorted(os.listdir(book_dir)):
+            parts += [filename, (book_dir / filename).read_bytes()]
+    return content_hash(*parts)
+
+
+def model_version(model_dir) -> str:
+    """
+    Reads name and version of a spaCy model from its 'meta.json' without loading the model.
+
+    :param model_dir: directory of the model
+    :return: model name and version (e.g. 'en_core_web_sm-2.3.1'), empty string if the model has no meta file
+    """
+    meta_file = model_dir / 'meta.json'
+    if not meta_file.exists():
+        return ''
+    meta = json.loads(meta_file.read_text(encoding='utf-8'))
+    return '{}_{}-{}'.format(meta.get('lang'), meta.get('name'), meta.get('version'))
+
+
+class BuildCache:
+    """
+    Stores the results of one stage of the dataset build per book,
+    so that only books whose inputs changed have to be processed again.
+    """
+
+    def __init__(self, stage: str, cache_dir=None):
+        """
+        :param stage: name of the build stage (used as directory name)
+        :param cache_dir: base directory of the cache (default: {PROJECT_DIR}/data/interim/cache)
+        """
+        self.directory = (cache_dir or constants.BUILD_CACHE_DIR) / stage
+
+    @staticmethod
+    def key(*hashes, **params) -> str:
+        """
+        Creates a cache key out of the hashes of all inputs and the parameters of a stage.
+
+        :param hashes: hashes of the input data
+        :param params: parameters of the stage (must be JSON serializable)
+        :return: cache key
+        """
+        return content_hash(*hashes, json.dumps(params, sort_keys=True))
+
+    def _file(self, title: str):
+        return self.directory / '{}.pkl'.format(title)
+
+    def get(self, title: str, key: str):
+        """
+        :param title: book title
+        :param key: cache key
+        :return: the stored result of the book or None if there is none for the given key
+        """
+        file = self._file(title)
+        if not file.exists():
+            return None
+        try:
+            with open(file, 'rb') as f_in:
+                entry = pickle.load(f_in)
+        except (EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+            # truncated by an interrupted build or written by other versions of the libraries, treated as a miss
+            return None
+        return entry['value'] if entry['key'] == key else None
+
+    def put(self, title: str, key: str, value):
+        """
+        Stores the result of a book, replacing the previous one.
+
+        :param title: book title
+        :param key: cache key
+        :param value: result (must be picklable)
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        file = self._file(title)
+        # written to a temporary file first, an interrupted build must not leave a truncated entry
+        handle, temp_file = tempfile.mkstemp(suffix='.tmp', dir=str(self.directory))
+        try:
+            with os.fdopen(handle, 'wb') as f_out:
+                pickle.dump({'key': key, 'value': value}, f_out)
+            os.replace(temp_file, str(file))
+        except BaseException:
+            os.remove(temp_file)
+            raise
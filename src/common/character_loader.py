@@ -1,7 +1,9 @@
 import os
 
 from src.common import constants
+from src.object.AliasMatcher import AliasMatcher
 from src.object.Character import Character
+from src.object.CharacterIndex import CharacterIndex
 
 
 def load_characters_from_dir(book_dir) -> list:
@@ -15,13 +17,13 @@ def load_characters_from_dir(book_dir) -> list:
     """
     characters = set()
     names = set()
-    for (_, _, filenames) in os.walk(book_dir):
+    for (dir_path, _, filenames) in os.walk(book_dir):
         for filename in filenames:
             if filename != 'persons.txt':
                 ref_name = filename.split('.')[0]
                 if ref_name not in names:
                     names.add(ref_name)
-                    alt_names = open((book_dir / filename).resolve(), 'r').read().split('\n')
+                    alt_names = open(os.path.join(dir_path, filename), 'r').read().split('\n')
                     characters.add(Character(ref_name, alt_names))
 
     return sorted(characters, key=lambda c: c.ref_name)
@@ -48,7 +50,48 @@ def load_characters_for_book(book: str) -> list:
     return load_characters_from_dir(book_dir)
 
 
-ALL_CHARACTERS = load_all_characters()
+_ALL_CHARACTERS = None
+_ALL_CHARACTERS_MATCHER = None
+_ALL_CHARACTERS_INDEX = None
+
+
+def all_characters() -> list:
+    """
+    :return: list of all Character objects, the character files are only read once
+    """
+    global _ALL_CHARACTERS
+    if _ALL_CHARACTERS is None:
+        _ALL_CHARACTERS = load_all_characters()
+    return _ALL_CHARACTERS
+
+
+def all_characters_matcher() -> AliasMatcher:
+    """
+    :return: AliasMatcher of all characters, only built once
+    """
+    global _ALL_CHARACTERS_MATCHER
+    if _ALL_CHARACTERS_MATCHER is None:
+        _ALL_CHARACTERS_MATCHER = AliasMatcher(all_characters())
+    return _ALL_CHARACTERS_MATCHER
+
+
+def all_characters_index() -> CharacterIndex:
+    """
+    :return: CharacterIndex of all characters, only built once
+    """
+    global _ALL_CHARACTERS_INDEX
+    if _ALL_CHARACTERS_INDEX is None:
+        _ALL_CHARACTERS_INDEX = CharacterIndex(all_characters())
+    return _ALL_CHARACTERS_INDEX
+
+
+def __getattr__(name):
+    # ALL_CHARACTERS and ALL_CHARACTERS_MATCHER are only loaded when they are used
+    if name == 'ALL_CHARACTERS':
+        return all_characters()
+    if name == 'ALL_CHARACTERS_MATCHER':
+        return all_characters_matcher()
+    raise AttributeError("module '{}' has no attribute '{}'".format(__name__, name))
 
 
 def find_character_for_pov(pov: str) -> Character:
@@ -57,11 +100,9 @@ def find_character_for_pov(pov: str) -> Character:
     :param pov: character name (usually the name given in chapter header)
     :return: Character object of the given pov character name
     """
-    return next(
-        filter(lambda c: c.appears_in([pov]), ALL_CHARACTERS),
-        Character(pov, [pov])
-    )
+    char = all_characters_index().find(pov)
+    return char if char is not None else Character(pov, [pov])
 
 
 def print_all_characters():
-    [print('\n'.join(c.alt_names)) for c in ALL_CHARACTERS]
+    [print('\n'.join(c.alt_names)) for c in all_characters()]
@@ -15,6 +15,10 @@ load_dotenv(_DOTENV_PATH)
 LOGGER_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 
 _ENV_JSON_COMPRESS_LVL = 'JSON_COMPRESS_LVL'
+_ENV_INTERIM_TOKENS = 'INTERIM_TOKENS'
+_ENV_INTERIM_FORMAT = 'INTERIM_FORMAT'
+_ENV_TEXT_STATS_CHUNKED = 'TEXT_STATS_CHUNKED'
+_ENV_TEXT_STATS_PROCESSES = 'TEXT_STATS_PROCESSES'
 _ENV_OVERWRITE_INTERIM_DATA = 'OVERWRITE_INTERIM_DATA'
 _ENV_OVERWRITE_PROCESSED_DATA = 'OVERWRITE_PROCESSED_DATA'
 _ENV_WORD_CLOUD_FONT_PATH = 'WORD_CLOUD_FONT_PATH'
@@ -27,6 +31,9 @@ RAW_DATA_DIR = DATA_DIR / 'raw'
 MODEL_DATA_DIR = DATA_DIR / 'model'
 INTERIM_DATA_DIR = DATA_DIR / 'interim'
 PROCESSED_DATA_DIR = DATA_DIR / 'processed'
+BUILD_CACHE_DIR = INTERIM_DATA_DIR / 'cache'
+DOC_CACHE_DIR = INTERIM_DATA_DIR / 'docs'
+INDEX_DIR = INTERIM_DATA_DIR / 'index'
 
 MODEL_DIR = PROJECT_DIR / 'models'
 REFERENCES_DIR = PROJECT_DIR / 'references'
@@ -35,11 +42,22 @@ REPORTS_DIR = PROJECT_DIR / 'reports'
 RELATIONSHIP_CSV_FILENAME = 'character_relationships.csv'
 TEXT_STATS_CSV_FILENAME = 'book_textstats.csv'
 CENTRALITY_CSV_FILENAME = 'Centralities {}.csv'
+TEMPORAL_CENTRALITY_FILENAME = 'temporal_centralities.{}'
+DATABASE_FILENAME = 'analysis.sqlite'
 
 FORCE_INTERIM_SAVE = os.getenv(_ENV_OVERWRITE_INTERIM_DATA).lower() in ['true', '1', 'yes']
 FORCE_PROCESSED_SAVE = os.getenv(_ENV_OVERWRITE_PROCESSED_DATA).lower() in ['true', '1', 'yes']
 
 JSON_COMPRESS_LVL = int(os.getenv(_ENV_JSON_COMPRESS_LVL)) if os.getenv('%s' % _ENV_JSON_COMPRESS_LVL) else 9
+# save the tokenized words of a book alongside its lines in the interim files
+INTERIM_TOKENS = os.getenv(_ENV_INTERIM_TOKENS, 'false').lower() in ['true', '1', 'yes']
+# file format of the interim books: 'json' (gzipped json) or 'binary' (see book_io.save_binary)
+INTERIM_FORMAT = os.getenv(_ENV_INTERIM_FORMAT, 'json').lower()
+INTERIM_FILE_EXTENSIONS = {'json': '.json.gz', 'binary': '.bin'}
+# parse the books chapter by chapter for the text stats instead of as one spaCy doc
+TEXT_STATS_CHUNKED = os.getenv(_ENV_TEXT_STATS_CHUNKED, 'false').lower() in ['true', '1', 'yes']
+# number of processes spaCy parses the chapters with in chunked mode
+TEXT_STATS_PROCESSES = int(os.getenv(_ENV_TEXT_STATS_PROCESSES, '1'))
 
 CSV_CHAR_MENT = 'mentions'
 CSV_CHAR_HITS = 'hits'
@@ -47,6 +65,8 @@ CSV_CHAR_IMPR = 'importance'
 CSV_CHAR_SRC = 'source'
 CSV_CHAR_TRG = 'target'
 CSV_CHAR_BOOK = 'book'
+CSV_CHAR_CHAPTER = 'chapter'
+CSV_CHAR_CHAR = 'character'
 
 CENT_CSV_TR = 'text_rank'
 CENT_CSV_OTR = 'own_text_rank'
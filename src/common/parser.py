@@ -1,4 +1,5 @@
 import re
+from itertools import chain
 from os import walk
 
 from pathlib import Path
@@ -31,85 +32,208 @@ def book_number_from_path(book_path: str) -> float:
     return num / 10
 
 
-def parse_chapters(content: list) -> list:
+# chapter header, e.g. 'Chapter Two: Holden' or 'Interlude: Miller'
+CHAPTER_HEADER_PATTERN = r'(Chapter|Epilogue|Prologue|Interlude)( )?(-?[A-Za-z]+){0,2}?:( )?'
+# chapter headers and segment breaks ('* * *'), each as a whole line
+BOUNDARY_PATTERN = re.compile(r'(?:(?P<header>' + CHAPTER_HEADER_PATTERN + r'[^\n]*)|\* \* \*)(?=\n|\Z)')
+# the same boundaries after a line break, the leading '\n' lets the regex engine skip quickly to the next line
+LINE_BOUNDARY_PATTERN = re.compile(r'\n' + BOUNDARY_PATTERN.pattern)
+
+
+def find_boundaries(text: str):
     """
-    Reads all the line found in one book file and converts them into Chapter objects.
+    Finds all chapter headers and segment breaks in a text.
 
-    Ignores blank lines.
+    :param text: text
+    :return: generator of (start, end, header) tuples, `end` includes the line break of the boundary line,
+             `header` is None for segment breaks
+    """
+    first = BOUNDARY_PATTERN.match(text)
+    if first:
+        yield 0, min(first.end() + 1, len(text)), first.group('header')
+    for match in LINE_BOUNDARY_PATTERN.finditer(text):
+        yield match.start() + 1, min(match.end() + 1, len(text)), match.group('header')
 
-    :param content: file content from 'book.txt'
-    :return: list of chapters in a book
+
+def split_lines(text: str) -> list:
     """
-    from src.common.character_loader import find_character_for_pov
+    Splits a text into lines like `readlines` does: every line keeps its line break.
 
-    chapters = []
-    chapter_start = -1
-    current_chapter = None
-    chapter_pattern = re.compile(r'^(Chapter|Epilogue|Prologue|Interlude)( )?(-?[A-Za-z]+){0,2}?:( )?')
-    chapter_count = 0
+    :param text: text
+    :return: list of lines
+    """
+    lines = text.split('\n')
+    last = lines.pop()
+    lines = [line + '\n' for line in lines]
+    if last:
+        lines.append(last)
+    return lines
 
-    for (i, line) in enumerate(content):
-        if re.search(chapter_pattern, line):
-            if current_chapter:
-                current_chapter.segments = parse_chapter(content[chapter_start:i])
-            chapter_start = i + 1
-            head = line.split(':')
-            chapter_type = ChapterType.parse(head[0].split(' ')[0].strip())
-            pov_character = head[-1].strip()
-            char = find_character_for_pov(pov_character)
-            current_chapter = Chapter(chapter_count, char, [], chapter_type)
-            chapter_count += 1
-            chapters.append(current_chapter)
 
-        if len(chapters) == 0:
-            from src.object.Character import Character
+class ChapterSplitter:
+    """
+    Splits the text of a book into Chapter and Segment objects.
 
-            # Novellas don't have chapter headers
-            chapter_start = i
-            current_chapter = Chapter(chapter_count, Character('', []), [], ChapterType.CHAPTER)
-            chapter_count += 1
-            chapters.append(current_chapter)
+    The text is searched for chapter headers and segment breaks with a single regular expression.
+    Chapters and segments are cut out of the text between the matches, blank lines are kept.
+    The text may be fed in several parts, as long as every part ends with a complete line.
+    """
 
-    # last chapter needs to be segmented too
-    current_chapter.segments = parse_chapter(content[chapter_start:])
+    def __init__(self):
+        self.chapter_count = 0
+        self._chapter = None
+        self._segments = []
+        self._segment_text = []
+        self._characters = dict()  # pov name from the header -> Character
+
+    def _character(self, pov: str):
+        from src.common.character_loader import find_character_for_pov
+
+        if pov not in self._characters:
+            self._characters[pov] = find_character_for_pov(pov)
+        return self._characters[pov]
+
+    def _end_segment(self):
+        text = ''.join(self._segment_text)
+        self._segment_text = []
+        if text:
+            self._segments.append(Segment(len(self._segments), split_lines(text)))
+
+    def _end_chapter(self) -> list:
+        self._end_segment()
+        if self._chapter is None:
+            return []
+        self._chapter.segments = self._segments
+        self._segments = []
+        return [self._chapter]
+
+    def _start_chapter(self, pov, chapter_type: ChapterType) -> list:
+        done = self._end_chapter()
+        self._chapter = Chapter(self.chapter_count, pov, [], chapter_type)
+        self.chapter_count += 1
+        return done
+
+    def feed(self, text: str) -> list:
+        """
+        Splits the next part of the text.
+
+        :param text: part of the book text that ends with a complete line
+        :return: list of all chapters that were completed by this part
+        """
+        done = []
+        boundaries = find_boundaries(text)
+        if self._chapter is None and text:
+            first = next(boundaries, None)
+            if first is None or first[0] > 0 or not first[2]:
+                from src.object.Character import Character
+
+                # Novellas don't have chapter headers
+                done += self._start_chapter(Character('', []), ChapterType.CHAPTER)
+            if first is not None:
+                boundaries = chain([first], boundaries)
+
+        position = 0
+        for (start, end, header) in boundaries:
+            self._segment_text.append(text[position:start])
+            position = end
+            if header:
+                head = header.split(':')
+                chapter_type = ChapterType.parse(head[0].split(' ')[0].strip())
+                done += self._start_chapter(self._character(head[-1].strip()), chapter_type)
+            else:
+                self._end_segment()
+        self._segment_text.append(text[position:])
+
+        return done
+
+    def close(self) -> list:
+        """
+        Completes the last chapter.
+
+        :return: list with the last chapter (empty if the text was empty)
+        """
+        done = self._end_chapter()
+        self._chapter = None
+        return done
+
+
+def parse_text(text: str) -> list:
+    """
+    Converts the whole text of one book file into Chapter objects.
 
-    return chapters
+    :param text: file content from 'book.txt'
+    :return: list of chapters in a book
+    """
+    splitter = ChapterSplitter()
+    return splitter.feed(text) + splitter.close()
 
 
-def parse_chapter(chapter_content: list) -> list:
+def parse_chapters(content: list) -> list:
     """
-    parses all segments of a chapter
-    :param chapter_content: content of the chapter
-    :return: list of segments
+    Reads all the line found in one book file and converts them into Chapter objects.
+
+    :param content: lines of the file content from 'book.txt'
+    :return: list of chapters in a book
+    """
+    return parse_text(''.join(content))
+
+
+def iter_chapters(file, block_size: int = 1024 * 1024):
+    """
+    Parses the chapters of a book file while it is read.
+    Only one block of the file and the current chapter are kept in memory,
+    so very large files (e.g. omnibus editions) can be parsed.
+
+    :param file: file object of the 'book.txt' file opened in text mode
+    :param block_size: number of characters read at once
+    :return: generator of Chapter objects
     """
-    segments = []
-    current_segment = Segment(0, [])
-    segment_pattern = re.compile(r'^\* \* \*$')
-    segment_start = 0
+    splitter = ChapterSplitter()
+    remainder = ''
+    for block in iter(lambda: file.read(block_size), ''):
+        block = remainder + block
+        # only complete lines are split
+        cut = block.rfind('\n') + 1
+        remainder = block[cut:]
+        yield from splitter.feed(block[:cut])
+    yield from splitter.feed(remainder)
+    yield from splitter.close()
 
-    for (i, line) in enumerate(chapter_content):
-        if re.search(segment_pattern, line):
-            current_segment = parse_segment(chapter_content[segment_start:i], current_segment, segments)
-            segment_start = i + 1
 
-    parse_segment(chapter_content[segment_start:], current_segment, segments)
+_BOOK_FILES = None
 
-    return segments
+
+def book_files(refresh: bool = False) -> dict:
+    """
+    Indexes the 'book.txt' files in the 'data/raw/{number}_{title}' directories of this project.
+    The directories are only walked once, later calls return the same index.
+
+    :param refresh: walk the directories again
+    :return: { title: path of the book file } dictionary
+    """
+    global _BOOK_FILES
+    if _BOOK_FILES is None or refresh:
+        _BOOK_FILES = dict()
+        for (dir_path, _, filenames) in walk(RAW_DATA_DIR):
+            filename = next((file for file in filenames if re.search(r'^(book)', file)), None)
+            if filename:
+                _BOOK_FILES[book_name_from_path(dir_path)] = Path(dir_path) / filename
+    return _BOOK_FILES
 
 
-def parse_segment(segment_content: list, segment: Segment, segments: list) -> Segment:
+def book_file(title: str) -> Path:
     """
-    Parses a single segment in one chapter.
-    :param segment_content: content of the segment
-    :param segment: current segment
-    :param segments: list of parsed segments
-    :return: Segment object
+    :param title: title of the book (or a part of the book directory name)
+    :return: path of the 'book.txt' file of the book, None if there is none
     """
-    if len(segment_content) > 0:
-        segment.lines = segment_content
-        segments.append(segment)
-        segment = Segment(segment.number + 1, [])
-    return segment
+    for refresh in (False, True):
+        files = book_files(refresh)
+        if title in files:
+            return files[title]
+        matches = [file for file in files.values() if str(file.parent).find(title) >= 0]
+        if matches:
+            return matches[-1]
+    return None
 
 
 def parse_book(title: str) -> Book:
@@ -120,20 +244,102 @@ def parse_book(title: str) -> Book:
     :param title: of the book
     :return: Book object
     """
-    book = None
-    for (dir_path, _, filenames) in walk(RAW_DATA_DIR):
-        if len(filenames) > 0:
-            book_number = book_number_from_path(dir_path)
-            if dir_path.find(title) < 0:
-                continue
+    book_path = book_file(title)
+    if book_path is None:
+        return None
 
-            book = Book(title, book_number, [])
-            book_path = Path(dir_path) / next(file for file in filenames if re.search(r'^(book)', file))
-            book.chapters = parse_chapters(open(book_path.resolve(), 'r').readlines())
+    book = Book(title, book_number_from_path(str(book_path.parent)), [])
+    with open(book_path.resolve(), 'r') as file:
+        book.chapters = list(iter_chapters(file))
 
     return book
 
 
+# text between quotation marks
+SPEECH_PATTERN = re.compile(r'(?<=“).*?(?=”)')
+# pipes needed for noun chunks (spaCy 2 and 3), all other pipes are disabled during speaker attribution
+SPEECH_PIPES = {'tok2vec', 'tagger', 'attribute_ruler', 'morphologizer', 'parser'}
+
+
+def split_speech(line: str) -> tuple:
+    """
+    Finds the speech in a line of text and the fragment of the line that names the speaker.
+
+    :param line: text line
+    :return: (spoken line, attribution fragment or None)
+    """
+    matches = list(SPEECH_PATTERN.finditer(line))
+    speech = ' '.join(match.group(0) for match in matches)
+    # the speaker is named after a closing quotation mark, before the next opening one
+    if any(match.end() + 1 < len(line) for match in matches):
+        return speech, line.split('”')[1].split('“')[0]
+    return speech, None
+
+
+def attribute_speakers(nlp, fragments: list, batch_size: int = 256, n_process: int = 1) -> dict:
+    """
+    Finds the speaker (the first noun chunk) in each attribution fragment.
+    All distinct fragments are processed in batches with only the pipes needed for noun chunks.
+
+    :param nlp: spacy nlp object
+    :param fragments: attribution fragments (see `split_speech`)
+    :param batch_size: number of fragments per batch
+    :param n_process: number of processes spaCy uses
+    :return: { fragment: speaker } dictionary, fragments without a noun chunk are left out
+    """
+    distinct = list(dict.fromkeys(fragments))
+    disable = [pipe for pipe in nlp.pipe_names if pipe not in SPEECH_PIPES]
+    speakers = dict()
+    for fragment, doc in zip(distinct, nlp.pipe(distinct, batch_size=batch_size, n_process=n_process,
+                                                disable=disable)):
+        nouns = [chunk.text for chunk in doc.noun_chunks]
+        if nouns:
+            speakers[fragment] = nouns[0].strip()
+
+    return speakers
+
+
+def parse_speeches(nlp, segments: list, batch_size: int = 256, n_process: int = 1) -> list:
+    """
+    Parses all speeches in several segments (e.g. all segments of a book) at once.
+
+    :param nlp: spacy nlp object
+    :param segments: list of Segment objects
+    :param batch_size: number of attribution fragments per spaCy batch
+    :param n_process: number of processes spaCy uses
+    :return: list with a list of Speech objects for each segment
+    """
+    found = []
+    for segment in segments:
+        speeches = []
+        for i, line in enumerate(segment.lines):
+            spoken_line, fragment = split_speech(line)
+            if spoken_line:
+                speeches.append((i, spoken_line, fragment))
+        found.append(speeches)
+
+    fragments = [fragment for speeches in found for (_, _, fragment) in speeches if fragment is not None]
+    speakers = attribute_speakers(nlp, fragments, batch_size, n_process)
+
+    return [[Speech(speakers.get(fragment, 'N/A'), spoken_line, i) for (i, spoken_line, fragment) in speeches]
+            for speeches in found]
+
+
+def parse_speech_in_book(nlp, book: Book, batch_size: int = 256, n_process: int = 1) -> dict:
+    """
+    Parses all speeches in a book.
+
+    :param nlp: spacy nlp object
+    :param book: Book object
+    :param batch_size: number of attribution fragments per spaCy batch
+    :param n_process: number of processes spaCy uses
+    :return: { (chapter number, segment number): [Speech] } dictionary
+    """
+    keys = [(chapter.number, segment.number) for chapter in book.chapters for segment in chapter.segments]
+    segments = [segment for chapter in book.chapters for segment in chapter.segments]
+    return dict(zip(keys, parse_speeches(nlp, segments, batch_size, n_process)))
+
+
 def parse_speech_in_segment(nlp, segment: Segment) -> list:
     """
     Parses all speeches in a segment.
@@ -142,13 +348,7 @@ def parse_speech_in_segment(nlp, segment: Segment) -> list:
     :param nlp: spacy nlp object
     :return: list of found speeches and its speakers
     """
-    speeches = []
-    for i, line in enumerate(segment.lines):
-        spoken_line, speaker = parse_speech(line, nlp)
-        if spoken_line:
-            speeches.append(Speech(speaker, spoken_line, i))
-
-    return speeches
+    return parse_speeches(nlp, [segment])[0]
 
 
 def parse_speech(line: str, nlp) -> tuple:
@@ -159,15 +359,9 @@ def parse_speech(line: str, nlp) -> tuple:
     :param nlp: spacy nlp object
     :return: the spoken line and the speaker
     """
-    speech_pattern = re.compile(r'(?<=“).*?(?=”)')
-    speech = speech_pattern.findall(line)
+    spoken_line, fragment = split_speech(line)
     speaker = "N/A"
-    ids = [line.index(s) + len(s) + 1 for s in speech]
-    for idx in ids:
-        if idx < len(line):
-            doc = nlp(line.split('”')[1].split('“')[0])
-            nouns = [chunk.text for chunk in doc.noun_chunks]
-            if nouns:
-                speaker = nouns[0].strip()
-
-    return ' '.join(speech), speaker
+    if fragment is not None:
+        speaker = attribute_speakers(nlp, [fragment]).get(fragment, speaker)
+
+    return spoken_line, speaker
@@ -0,0 +1,233 @@
+import contextlib
+import cProfile
+import itertools
+import pstats
+import re
+import time
+import tracemalloc
+from datetime import datetime
+
+from src.common import constants
+
+__all__ = ['Profiler', 'profile', 'profile_stage', 'active_profiler']
+
+# Profiler that records all profiled sections, see `Profiler.__enter__`
+_ACTIVE_PROFILER = None
+# the peak of each section can only be measured if the peak can be reset (Python 3.9+)
+_SECTION_PEAKS = hasattr(tracemalloc, 'reset_peak')
+
+
+class _Section:
+    """
+    Measurements of one profiled section
+    """
+
+    def __init__(self, name: str, depth: int):
+        self.name = name
+        self.depth = depth
+        self.profile = cProfile.Profile()
+        self.children = []
+        self.seconds = 0
+        self.start_memory = 0
+        self.peak_memory = 0
+        self.snapshot = None
+        self.top_allocations = []
+        self.stats_file = None
+
+    def stats(self) -> pstats.Stats:
+        """
+        :return: profiler stats of this section including all nested sections
+        """
+        stats = pstats.Stats()
+        for source in [self.profile] + [child.stats() for child in self.children]:
+            try:
+                stats.add(source)
+            except TypeError:
+                # nothing was recorded
+                pass
+        return stats
+
+
+class Profiler:
+    """
+    Records cProfile stats and the peak and top allocations traced by tracemalloc of named sections of code.
+
+    Used as context manager the profiler collects all sections that are opened with `profile` until it is closed,
+    then it writes one .pstats file per section and a summary table to {PROJECT_DIR}/reports/profiles/<date>.
+    Sections can be nested (e.g. one section per book inside the section of a stage), the stats of a section
+    include its nested sections.
+    """
+
+    def __init__(self, output_dir=None, top: int = 10):
+        """
+        :param output_dir: directory of the reports (default: {PROJECT_DIR}/reports/profiles/<date>)
+        :param top: number of allocations that are listed per section
+        """
+        self.output_dir = output_dir
+        self.top = top
+        self.sections = []
+        self._stack = []
+        self._stop_tracing = False
+        self._previous = None
+
+    def __enter__(self):
+        global _ACTIVE_PROFILER
+        self._previous = _ACTIVE_PROFILER
+        _ACTIVE_PROFILER = self
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._stop_tracing = True
+        return self
+
+    def __exit__(self, *args):
+        global _ACTIVE_PROFILER
+        _ACTIVE_PROFILER = self._previous
+        if self._stop_tracing:
+            tracemalloc.stop()
+            self._stop_tracing = False
+        if self.sections:
+            self.write_reports()
+
+    @contextlib.contextmanager
+    def section(self, name: str):
+        """
+        Profiles the code in the with block.
+
+        :param name: name of the section in the reports
+        """
+        section = _Section(name, len(self._stack))
+        parent = self._stack[-1] if self._stack else None
+        if parent is not None:
+            parent.profile.disable()
+            parent.children.append(section)
+            if _SECTION_PEAKS:
+                parent.peak_memory = max(parent.peak_memory, tracemalloc.get_traced_memory()[1])
+        self.sections.append(section)
+        self._stack.append(section)
+
+        section.snapshot = self._snapshot()
+        section.start_memory = tracemalloc.get_traced_memory()[0]
+        if _SECTION_PEAKS:
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        section.profile.enable()
+        try:
+            yield section
+        finally:
+            section.profile.disable()
+            section.seconds = time.perf_counter() - start
+            if _SECTION_PEAKS:
+                section.peak_memory = max(section.peak_memory, tracemalloc.get_traced_memory()[1])
+            section.top_allocations = [stat for stat in self._snapshot().compare_to(section.snapshot, 'lineno')
+                                       if stat.size_diff > 0][:self.top]
+            section.snapshot = None
+            self._stack.pop()
+            if _SECTION_PEAKS:
+                tracemalloc.reset_peak()
+            if parent is not None:
+                parent.peak_memory = max(parent.peak_memory, section.peak_memory)
+                parent.profile.enable()
+
+    @staticmethod
+    def _snapshot() -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces([tracemalloc.Filter(False, tracemalloc.__file__),
+                                                          tracemalloc.Filter(False, __file__)])
+
+    def summary(self) -> list:
+        """
+        :return: list of (name, seconds, peak memory in bytes above the memory at the start) tuples
+                 of all sections in the order they were opened, nested sections are indented
+                 (the peak memory is None before Python 3.9)
+        """
+        return [('  ' * section.depth + section.name, section.seconds,
+                 section.peak_memory - section.start_memory if _SECTION_PEAKS else None)
+                for section in self.sections]
+
+    def write_reports(self):
+        """
+        Writes the .pstats file of each section and 'summary.txt' with the time, peak memory
+        and top allocations of all sections.
+        """
+        if self.output_dir is None:
+            directory = constants.REPORTS_DIR / 'profiles' / datetime.now().strftime('%Y-%m-%d_%H-%M-%S')
+            self.output_dir = directory
+            # several profilers may finish within the same second
+            for i in itertools.count(2):
+                if not self.output_dir.exists():
+                    break
+                self.output_dir = directory.with_name('{}_{}'.format(directory.name, i))
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        lines = ['{:<60} {:>10} {:>12}  {}'.format('section', 'seconds', 'peak MiB', 'stats file')]
+        for i, (section, (name, seconds, peak)) in enumerate(zip(self.sections, self.summary())):
+            section.stats_file = self.output_dir / '{:03d}_{}.pstats'.format(i, re.sub(r'[^\w.-]+', '_', section.name))
+            section.stats().dump_stats(str(section.stats_file))
+            peak = '{:.1f}'.format(peak / (1024 * 1024)) if peak is not None else 'n/a'
+            lines.append('{:<60} {:>10.3f} {:>12}  {}'.format(name, seconds, peak, section.stats_file.name))
+
+        for section in self.sections:
+            lines += ['', 'Top allocations of {}:'.format(section.name)]
+            lines += ['  {}'.format(stat) for stat in section.top_allocations]
+        (self.output_dir / 'summary.txt').write_text('\n'.join(lines) + '\n', encoding='utf-8')
+
+
+def active_profiler() -> Profiler:
+    """
+    :return: the Profiler that is used as context manager at the moment, None if there is none
+    """
+    return _ACTIVE_PROFILER
+
+
+class profile(contextlib.ContextDecorator):
+    """
+    Profiles a block of code (context manager) or every call of a function (decorator).
+
+    The section is recorded by the active Profiler. Without an active Profiler (e.g. in a notebook),
+    a Profiler is created for the section and writes its reports when the section ends:
+
+        with profile('load_books'):
+            books = load_books()
+
+        @profile()
+        def centralities(calculator):
+            return calculator.compute_all()
+    """
+
+    def __init__(self, name: str = None):
+        """
+        :param name: name of the section in the reports (default: qualified name of the decorated function)
+        """
+        self.name = name
+        self._standalone = []
+
+    def __call__(self, func):
+        if self.name is None:
+            self.name = func.__qualname__
+        return super().__call__(func)
+
+    def __enter__(self):
+        profiler = active_profiler()
+        standalone = profiler is None
+        if standalone:
+            profiler = Profiler().__enter__()
+        section = profiler.section(self.name)
+        self._standalone.append((profiler if standalone else None, section))
+        return section.__enter__()
+
+    def __exit__(self, *args):
+        profiler, section = self._standalone.pop()
+        section.__exit__(*args)
+        if profiler is not None:
+            profiler.__exit__(*args)
+        return False
+
+
+def profile_stage(name: str):
+    """
+    Hook for the stages of a pipeline: profiles the block only while a Profiler is active.
+
+    :param name: name of the section in the reports
+    :return: context manager
+    """
+    if active_profiler() is None:
+        return contextlib.nullcontext()
+    return profile(name)
@@ -0,0 +1,329 @@
+# -*- coding: utf-8 -*-
+import argparse
+import json
+import logging
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+from src.common import constants
+
+LOG = logging.getLogger(__name__)
+
+# book in {PROJECT_DIR}/data/raw the benchmarks run on
+BENCHMARK_BOOK = 'Drive'
+# size of the generated character graph of the centrality benchmarks
+BENCHMARK_GRAPH_NODES = 150
+BENCHMARK_GRAPH_DENSITY = 0.02
+
+CENTRALITY_METHODS = ['text_rank', 'text_rank_nx', 'eigenvector', 'eigenvector_nx', 'katz_centrality',
+                      'katz_centrality_nx', 'degree', 'harmonic', 'closeness', 'betweenness_nx', 'compute_all']
+
+
+class Fixtures:
+    """
+    Fixed inputs of the benchmarks, created on first use so that single benchmarks can run on their own.
+    Files written by the benchmarks are kept in a temporary directory.
+    """
+
+    def __init__(self, book: str = BENCHMARK_BOOK, seed: int = 0):
+        """
+        :param book: title of the raw book the benchmarks run on
+        :param seed: seed of the generated data
+        """
+        self.title = book
+        self.seed = seed
+        self.directory = Path(tempfile.mkdtemp(prefix='benchmark-'))
+        self._book = None
+        self._characters = None
+        self._graph = None
+
+    def book(self):
+        """
+        :return: parsed Book object
+        """
+        if self._book is None:
+            from src.common.parser import parse_book
+
+            self._book = parse_book(self.title)
+            if self._book is None:
+                raise FileNotFoundError('book "{}" not found in {}'.format(self.title, constants.RAW_DATA_DIR))
+        return self._book
+
+    def characters(self) -> list:
+        """
+        :return: list of all Character objects
+        """
+        if self._characters is None:
+            from src.common.character_loader import load_all_characters
+
+            self._characters = sorted(load_all_characters(), key=lambda char: char.ref_name)
+        return self._characters
+
+    def graph(self) -> tuple:
+        """
+        Generates a random, weighted character graph in the form CentralityCalculator expects.
+
+        :return: (nodes, edges) tuple
+        """
+        if self._graph is None:
+            random = np.random.RandomState(self.seed)
+            nodes = ['character {:03d}'.format(i) for i in range(BENCHMARK_GRAPH_NODES)]
+            edges = {node: {} for node in nodes}
+            for i, j in zip(*np.nonzero(random.random_sample((len(nodes), len(nodes))) < BENCHMARK_GRAPH_DENSITY)):
+                if i != j:
+                    # importance is the share of the hits of a character, so the weights are small
+                    edges[nodes[i]][nodes[j]] = random.uniform(0.001, 0.05)
+            self._graph = (nodes, edges)
+        return self._graph
+
+    def close(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+def _parse_book(fixtures: Fixtures):
+    from src.common.parser import parse_book
+
+    return lambda: parse_book(fixtures.title)
+
+
+def _save_compressed(fixtures: Fixtures):
+    from src.common.book_io import save_compressed
+
+    book = fixtures.book()
+    return lambda: save_compressed(book)
+
+
+def _load_compressed(fixtures: Fixtures):
+    from src.common.book_io import load_compressed, save_compressed
+
+    save_compressed(fixtures.book())
+    file = constants.INTERIM_DATA_DIR / '{}.json.gz'.format(fixtures.title)
+    return lambda: load_compressed(file)
+
+
+def _segment_words(fixtures: Fixtures):
+    segments = [segment for chapter in fixtures.book().chapters for segment in chapter.segments]
+
+    def run():
+        for segment in segments:
+            # assigning the lines again drops the cached words
+            segment.lines = segment.lines
+            segment.words()
+    return run
+
+
+def _appearance_indices(fixtures: Fixtures):
+    texts = [segment.words() for chapter in fixtures.book().chapters for segment in chapter.segments]
+    characters = fixtures.characters()
+
+    def run():
+        for char in characters:
+            for words in texts:
+                char.appearance_indices(words)
+    return run
+
+
+def _find_in_book(fixtures: Fixtures):
+    from src.nlp.CharacterRelationship import CharacterRelationship
+
+    book = fixtures.book()
+    characters = fixtures.characters()
+    # pairs of the characters that appear most often in the book
+    words = book.words()
+    main = sorted(characters, key=lambda char: -len(char.appearance_indices(words)))[:10]
+    pairs = [(char1, char2) for i, char1 in enumerate(main) for char2 in main[i + 1:]]
+
+    def run():
+        for char1, char2 in pairs:
+            CharacterRelationship(char1, char2).find_in_book(book)
+    return run
+
+
+def _create_relationship_csv(fixtures: Fixtures):
+    import src.data.make_dataset as make_dataset
+
+    book = fixtures.book()
+    # all characters are looked up in the book, the build cache must not be used
+    book_dir = constants.REFERENCES_DIR / 'characters' / fixtures.title
+    if not book_dir.exists():
+        book_dir = fixtures.directory / 'references' / 'characters' / fixtures.title
+        book_dir.mkdir(parents=True, exist_ok=True)
+        for file in (constants.REFERENCES_DIR / 'characters').glob('*.txt'):
+            shutil.copy(file, book_dir)
+        constants.REFERENCES_DIR = book_dir.parents[1]
+
+    def run():
+        # the build cache of the benchmark run (see `run_benchmarks`)
+        shutil.rmtree(fixtures.directory / 'build_cache_dir', ignore_errors=True)
+        make_dataset.create_relationship_csv([book], True)
+    return run
+
+
+def _centrality(method: str):
+    def setup(fixtures: Fixtures):
+        from src.nlp.CentralityCalculator import CentralityCalculator
+
+        nodes, edges = fixtures.graph()
+        # intermediate results are cached per calculator, so every run starts with a new one
+        return lambda: getattr(CentralityCalculator(nodes, edges), method)()
+    return setup
+
+
+# name -> function that prepares the inputs and returns the function that is measured
+BENCHMARKS = {
+    'parser.parse_book': _parse_book,
+    'book_io.save_compressed': _save_compressed,
+    'book_io.load_compressed': _load_compressed,
+    'Segment.words': _segment_words,
+    'Character.appearance_indices': _appearance_indices,
+    'CharacterRelationship.find_in_book': _find_in_book,
+    'make_dataset.create_relationship_csv': _create_relationship_csv,
+}
+BENCHMARKS.update({'CentralityCalculator.{}'.format(method): _centrality(method) for method in CENTRALITY_METHODS})
+
+
+def measure(func, repeat: int = 5) -> dict:
+    """
+    Times a function and measures the memory it allocates.
+
+    :param func: function without parameters
+    :param repeat: number of timed runs
+    :return: dictionary with the best, median and mean time in seconds and the peak of allocated memory in bytes
+    """
+    # warm up, results of the first run may be cached afterwards just like in the pipeline
+    func()
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        seconds.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {'min': min(seconds), 'median': statistics.median(seconds), 'mean': statistics.mean(seconds),
+            'repeat': repeat, 'peak_memory': peak}
+
+
+def run_benchmarks(names: list = None, repeat: int = 5) -> dict:
+    """
+    Runs benchmarks on the sample book and generated data.
+    Files are written to a temporary directory instead of {PROJECT_DIR}/data.
+
+    :param names: names of the benchmarks (default: all, see BENCHMARKS)
+    :param repeat: number of timed runs per benchmark
+    :return: dictionary with information about the environment and the measurements per benchmark
+    """
+    fixtures = Fixtures()
+    directories = {name: getattr(constants, name) for name in
+                   ['INTERIM_DATA_DIR', 'PROCESSED_DATA_DIR', 'BUILD_CACHE_DIR', 'REFERENCES_DIR']}
+    for name in ['INTERIM_DATA_DIR', 'PROCESSED_DATA_DIR', 'BUILD_CACHE_DIR']:
+        setattr(constants, name, fixtures.directory / name.lower())
+        getattr(constants, name).mkdir(parents=True, exist_ok=True)
+
+    results = dict()
+    try:
+        for name in names or BENCHMARKS:
+            result = measure(BENCHMARKS[name](fixtures), repeat)
+            LOG.info('%-45s %10.2f ms %10.1f KiB', name, result['min'] * 1000, result['peak_memory'] / 1024)
+            results[name] = result
+    finally:
+        for name, directory in directories.items():
+            setattr(constants, name, directory)
+        fixtures.close()
+
+    return {'date': datetime.now().isoformat(timespec='seconds'), 'python': platform.python_version(),
+            'platform': platform.platform(), 'book': fixtures.title, 'results': results}
+
+
+def compare(old: dict, new: dict, threshold: float = 0.1) -> list:
+    """
+    Compares the results of two benchmark runs.
+    A benchmark regressed if its best time or its peak memory grew by more than the threshold
+    or if it is missing in the new run (e.g. it was renamed or removed).
+
+    :param old: results of the baseline run (see `run_benchmarks`)
+    :param new: results of the run to check
+    :param threshold: allowed relative growth (0.1 = 10 %)
+    :return: list of (name, time ratio, memory ratio, regressed) tuples of the benchmarks of both runs,
+             followed by the benchmarks that are missing in the new run (ratios are None)
+    """
+    rows = []
+    for name in new['results']:
+        if name not in old['results']:
+            continue
+        before = old['results'][name]
+        after = new['results'][name]
+        time_ratio = after['min'] / before['min'] if before['min'] else float('inf')
+        memory_ratio = after['peak_memory'] / before['peak_memory'] if before['peak_memory'] else 1.0
+        regressed = time_ratio > 1 + threshold or memory_ratio > 1 + threshold
+        rows.append((name, time_ratio, memory_ratio, regressed))
+    rows += [(name, None, None, True) for name in old['results'] if name not in new['results']]
+    return rows
+
+
+def log_comparison(rows: list) -> int:
+    """
+    :param rows: result of `compare`
+    :return: number of regressions
+    """
+    for name, time_ratio, memory_ratio, regressed in rows:
+        if time_ratio is None:
+            LOG.info('%-45s missing in the new results  REGRESSION', name)
+            continue
+        LOG.info('%-45s time x%5.2f  memory x%5.2f  %s', name, time_ratio, memory_ratio,
+                 'REGRESSION' if regressed else '')
+    return sum(1 for row in rows if row[3])
+
+
+def load_results(file) -> dict:
+    with open(file, 'r', encoding='utf-8') as f_in:
+        return json.load(f_in)
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format=constants.LOGGER_FORMAT)
+
+    parser = argparse.ArgumentParser(description='Measures the time and memory of the hot paths of the pipeline '
+                                                 'or compares two result files.')
+    parser.add_argument('benchmarks', nargs='*', metavar='BENCHMARK',
+                        help='benchmarks to run (default: all): {}'.format(', '.join(BENCHMARKS)))
+    parser.add_argument('--repeat', type=int, default=5, help='number of timed runs per benchmark (default: 5)')
+    parser.add_argument('--output', type=Path,
+                        help='result file (default: {PROJECT_DIR}/reports/benchmarks/<date>.json)')
+    parser.add_argument('--compare', nargs=2, type=Path, metavar=('OLD', 'NEW'),
+                        help='compare two result files instead of running the benchmarks')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='relative slowdown or memory growth that counts as regression (default: 0.1)')
+    args = parser.parse_args()
+
+    unknown = [name for name in args.benchmarks if name not in BENCHMARKS]
+    if unknown:
+        parser.error('unknown benchmarks: {}'.format(', '.join(unknown)))
+
+    if args.compare:
+        regressions = log_comparison(compare(load_results(args.compare[0]), load_results(args.compare[1]),
+                                             args.threshold))
+        LOG.info('%d regressions', regressions)
+        sys.exit(1 if regressions else 0)
+
+    report = run_benchmarks(args.benchmarks, args.repeat)
+    output = args.output or constants.REPORTS_DIR / 'benchmarks' / '{}.json'.format(
+        datetime.now().strftime('%Y-%m-%d_%H-%M-%S'))
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f_out:
+        json.dump(report, f_out, indent=2)
+    LOG.info('results written to %s', output)
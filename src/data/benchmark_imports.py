@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+import argparse
+import logging
+import subprocess
+import sys
+
+from src.common import constants
+
+LOG = logging.getLogger(__name__)
+
+# modules that are imported by the scripts of this project
+MODULES = ['src.common', 'src.object', 'src', 'src.nlp', 'src.data.make_dataset', 'src.visualization']
+
+_IMPORT_CODE = 'import time; start = time.perf_counter(); import {}; print(time.perf_counter() - start)'
+
+
+def import_time(module: str, repeat: int = 5) -> float:
+    """
+    Measures how long importing a module takes in a fresh interpreter.
+
+    :param module: name of the module
+    :param repeat: number of measurements
+    :return: the shortest import time in seconds, None if the module can't be imported
+    """
+    seconds = []
+    for _ in range(repeat):
+        result = subprocess.run([sys.executable, '-c', _IMPORT_CODE.format(module)], cwd=constants.PROJECT_DIR,
+                                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, universal_newlines=True)
+        if result.returncode != 0:
+            return None
+        seconds.append(float(result.stdout))
+    return min(seconds)
+
+
+def benchmark(modules: list, repeat: int = 5):
+    """
+    Logs the import time of each module.
+
+    :param modules: names of the modules
+    :param repeat: number of measurements per module
+    """
+    for module in modules:
+        seconds = import_time(module, repeat)
+        if seconds is None:
+            LOG.info('%-25s failed (missing dependency?)', module)
+        else:
+            LOG.info('%-25s %8.1f ms', module, seconds * 1000)
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format=constants.LOGGER_FORMAT)
+
+    parser = argparse.ArgumentParser(description='Measures how long importing the modules of this project takes.')
+    parser.add_argument('modules', nargs='*', default=MODULES, help='modules to import (default: all packages)')
+    parser.add_argument('--repeat', type=int, default=5, help='number of measurements per module (default: 5)')
+    args = parser.parse_args()
+
+    benchmark(args.modules, args.repeat)
@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+import argparse
+import logging
+import time
+
+from src.common import constants
+from src.common.parser import book_files, parse_book
+
+LOG = logging.getLogger(__name__)
+
+
+def benchmark(repeat: int = 5):
+    """
+    Parses every raw book several times and logs the best time per book.
+
+    :param repeat: number of times each book is parsed
+    """
+    total_seconds = 0
+    for title in sorted(book_files()):
+        seconds = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            book = parse_book(title)
+            seconds.append(time.perf_counter() - start)
+        size = len(book.content().encode('utf-8')) / (1024 * 1024)
+        segments = sum(len(chapter.segments) for chapter in book.chapters)
+        LOG.info('%-35s %3d chapters, %4d segments: %7.3fs (%.1f MB/s)',
+                 title, len(book.chapters), segments, min(seconds), size / min(seconds))
+        total_seconds += min(seconds)
+    LOG.info('all books: %.3fs', total_seconds)
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format=constants.LOGGER_FORMAT)
+
+    parser = argparse.ArgumentParser(description='Measures how long parsing the raw books takes.')
+    parser.add_argument('--repeat', type=int, default=5, help='number of times each book is parsed (default: 5)')
+    args = parser.parse_args()
+
+    benchmark(args.repeat)
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+import argparse
+import logging
+
+from src.common import constants
+from src.common.book_io import load_books
+from src.database import InvertedIndex
+
+LOG = logging.getLogger(__name__)
+
+
+def open_index(rebuild: bool = False) -> InvertedIndex:
+    """
+    Opens the inverted index of all books. The index is built if it doesn't exist yet, if `rebuild` is set
+    or if the books changed since it was built.
+
+    :param rebuild: build the index again even if the books didn't change
+    :return: InvertedIndex object
+    """
+    books = load_books()
+    if not rebuild and (constants.INDEX_DIR / 'meta.json').exists():
+        index = InvertedIndex()
+        if index.is_current(books):
+            return index
+        LOG.info('The books changed since the index was built')
+    LOG.info('Building index of all books ...')
+    return InvertedIndex.build(books)
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format=constants.LOGGER_FORMAT)
+
+    parser = argparse.ArgumentParser(description='Shows every occurrence of words or phrases in the books '
+                                                 '(keyword in context).')
+    parser.add_argument('queries', nargs='*', help='words or phrases to look up (case insensitive)')
+    parser.add_argument('--context', type=int, default=8, help='number of words around each match (default: 8)')
+    parser.add_argument('--book', action='append', help='only search this book (can be given several times)')
+    parser.add_argument('--rebuild', action='store_true', help='build the index again from the current books')
+    args = parser.parse_args()
+
+    index = open_index(args.rebuild)
+    for query in args.queries:
+        hits = index.kwic(query, args.context, args.book)
+        LOG.info('"%s": %d hits', query, len(hits))
+        for hit in hits:
+            print('{:<30} {:>3}/{:<2} {}'.format(hit.book, hit.chapter, hit.segment, hit.kwic_line()))
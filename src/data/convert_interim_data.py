@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+import argparse
+import logging
+import multiprocessing
+import resource
+import sys
+import time
+
+from src.common import constants
+from src.common.book_io import convert_interim_files, interim_files, load_interim
+
+LOG = logging.getLogger(__name__)
+
+
+def load_all(files: list) -> tuple:
+    """
+    Loads all given interim files and measures the time and memory it took.
+    Meant to run in a fresh process, so that the peak RSS isn't influenced by earlier loads.
+
+    :param files: list of interim file paths
+    :return: (seconds, peak RSS before loading in MB, peak RSS after loading in MB)
+    """
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    unit = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / unit
+    start = time.perf_counter()
+    books = [load_interim(file) for file in files]
+    seconds = time.perf_counter() - start
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / unit
+    del books
+
+    return seconds, rss_before, rss_after
+
+
+def benchmark():
+    """
+    Compares the load time and peak RSS of all interim files per format.
+    Every format is loaded in its own process.
+    """
+    files = {}
+    for file in interim_files(all_formats=True):
+        for interim_format, extension in constants.INTERIM_FILE_EXTENSIONS.items():
+            if str(file).endswith(extension):
+                files.setdefault(interim_format, []).append(file)
+
+    context = multiprocessing.get_context('spawn')
+    for interim_format, format_files in sorted(files.items()):
+        with context.Pool(1) as pool:
+            seconds, rss_before, rss_after = pool.apply(load_all, (format_files,))
+        LOG.info('%-6s %2d books: %7.3fs, peak RSS %7.1f MB (+%.1f MB)',
+                 interim_format, len(format_files), seconds, rss_after, rss_after - rss_before)
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format=constants.LOGGER_FORMAT)
+
+    parser = argparse.ArgumentParser(description='Converts the interim book files into another format.')
+    parser.add_argument('--to', choices=sorted(constants.INTERIM_FILE_EXTENSIONS), default=constants.INTERIM_FORMAT,
+                        help='target format (default: INTERIM_FORMAT)')
+    parser.add_argument('--tokens', action='store_true', default=constants.INTERIM_TOKENS,
+                        help='also save the tokenized words of the books')
+    parser.add_argument('--benchmark', action='store_true',
+                        help='compare load time and peak RSS of all formats after the conversion')
+    args = parser.parse_args()
+
+    for written in convert_interim_files(args.to, args.tokens):
+        LOG.info('wrote "%s"', written)
+    if args.benchmark:
+        benchmark()
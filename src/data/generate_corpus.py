@@ -0,0 +1,273 @@
+# -*- coding: utf-8 -*-
+import argparse
+import logging
+import re
+import shutil
+from pathlib import Path
+
+import numpy as np
+
+from src.common import constants
+
+# title prefix of all generated books, used to find them again
+SYNTHETIC_TITLE = 'Synthetic'
+
+_ONES = ['', 'One', 'Two', 'Three', 'Four', 'Five', 'Six', 'Seven', 'Eight', 'Nine', 'Ten', 'Eleven', 'Twelve',
+         'Thirteen', 'Fourteen', 'Fifteen', 'Sixteen', 'Seventeen', 'Eighteen', 'Nineteen']
+_TENS = ['', '', 'Twenty', 'Thirty', 'Forty', 'Fifty', 'Sixty', 'Seventy', 'Eighty', 'Ninety']
+# syllables of the filler words and of the character names, names don't share syllables with words
+_WORD_SYLLABLES = ['ba', 'de', 'ki', 'lo', 'mu', 'ne', 'pa', 'ri', 'so', 'tu', 've', 'an', 'el', 'or', 'ust']
+_NAME_SYLLABLES = ['Hol', 'Mar', 'Zan', 'Qir', 'Yev', 'Gorr', 'Wix', 'Jho', 'Fen', 'Cai', 'Thu', 'Xa']
+_NAME_ENDINGS = ['den', 'os', 'ix', 'ara', 'ul', 'esh', 'yn', 'im']
+
+
+def number_words(number: int) -> str:
+    """
+    Writes a chapter number like the books do (e.g. 'Twenty-One').
+
+    :param number: number between 1 and 99
+    :return: number in words
+    """
+    if not 0 < number < 100:
+        raise ValueError('chapter numbers must be between 1 and 99, not {}'.format(number))
+    if number < 20:
+        return _ONES[number]
+    return _TENS[number // 10] + ('-' + _ONES[number % 10] if number % 10 else '')
+
+
+def _zipf_probabilities(n: int) -> np.ndarray:
+    weights = 1 / np.arange(1, n + 1)
+    return weights / weights.sum()
+
+
+class CorpusGenerator:
+    """
+    Generates books in the format of the raw 'book.txt' files together with the alias files of their characters.
+
+    The text consists of made up words with a Zipf distribution. Character names are mentioned
+    with the given density, main characters more often than minor ones. Every chapter is told
+    from the point of view of one character and is split into segments by '* * *' lines.
+    Some paragraphs are dialogue in curly quotes.
+    """
+
+    def __init__(self, words: int = 100000, chapters: int = 50, characters: int = 40, density: float = 0.01,
+                 vocabulary: int = 5000, seed: int = 0):
+        """
+        :param words: number of words of a book (approximately)
+        :param chapters: number of chapters of a book, including prologue, interludes and epilogue (at most 99)
+        :param characters: number of characters of a book
+        :param density: share of words that are mentions of characters (approximately, dialogue tags add a few)
+        :param vocabulary: number of distinct filler words
+        :param seed: seed of the random generator
+        """
+        if not 0 <= density < 1:
+            raise ValueError('the mention density must be between 0 and 1')
+        self.words = words
+        self.chapters = chapters
+        self.characters = characters
+        self.density = density
+        self.random = np.random.RandomState(seed)
+        self.vocabulary = self._unique_words(vocabulary, _WORD_SYLLABLES, lambda s: ''.join(s))
+        self.word_probabilities = _zipf_probabilities(len(self.vocabulary))
+        self.char_probabilities = _zipf_probabilities(characters)
+        self.chapter_types = self._chapter_types()
+        if not 0 < self.chapter_types.count('Chapter') < 100:
+            raise ValueError('between 1 and 99 numbered chapters can be generated')
+
+    def _unique_words(self, count: int, syllables: list, join) -> list:
+        words = []
+        seen = set()
+        length = 2
+        while len(words) < count:
+            for _ in range(count * 4):
+                word = join(self.random.choice(syllables, self.random.randint(1, length + 1)))
+                if word not in seen:
+                    seen.add(word)
+                    words.append(word)
+                    if len(words) == count:
+                        break
+            length += 1
+        return words
+
+    def _chapter_types(self) -> list:
+        types = ['Chapter'] * self.chapters
+        if self.chapters >= 3:
+            types[0] = 'Prologue'
+            types[-1] = 'Epilogue'
+        if self.chapters >= 10:
+            types[self.chapters // 2] = 'Interlude'
+        return types
+
+    def cast(self) -> list:
+        """
+        Generates the names of the characters, ordered from main to minor characters.
+
+        :return: list of (first name, last name) tuples
+        """
+        names = self._unique_words(2 * self.characters, _NAME_SYLLABLES,
+                                   lambda s: s[0] + ''.join(s[1:]).lower() + self.random.choice(_NAME_ENDINGS))
+        return list(zip(names[:self.characters], names[self.characters:]))
+
+    def _mention(self, cast: list, char: int) -> list:
+        first, last = cast[char]
+        alias = self.random.randint(10)
+        if alias < 6:
+            return [first]
+        return [last] if alias < 9 else [first, last]
+
+    def _sentences(self, cast: list, count: int, pov: int):
+        """
+        :return: generator of sentences, lists of words without punctuation
+        """
+        words = self.random.choice(len(self.vocabulary), count, p=self.word_probabilities)
+        mentions = self.random.random_sample(count) < self.density
+        chars = self.random.choice(len(cast), count, p=self.char_probabilities)
+        # the pov character is mentioned more often in its chapters
+        chars[self.random.random_sample(count) < 0.3] = pov
+        position = 0
+        while position < count:
+            length = min(self.random.randint(4, 20), count - position)
+            sentence = []
+            for i in range(position, position + length):
+                sentence += self._mention(cast, chars[i]) if mentions[i] else [self.vocabulary[words[i]]]
+            position += length
+            yield sentence
+
+    def _paragraphs(self, cast: list, count: int, pov: int):
+        """
+        :return: generator of paragraph lines without line breaks
+        """
+        sentences = self._sentences(cast, count, pov)
+        done = False
+        while not done:
+            text = []
+            for _ in range(self.random.randint(2, 7)):
+                sentence = next(sentences, None)
+                if sentence is None:
+                    done = True
+                    break
+                text.append(sentence[0][0].upper() + ' '.join(sentence)[1:] + '.')
+            if not text:
+                break
+            if self.random.random_sample() < 0.2:
+                speaker = ' '.join(self._mention(cast, self.random.choice(len(cast), p=self.char_probabilities)))
+                yield '“{}” {} said.'.format(' '.join(text), speaker)
+            else:
+                yield ' '.join(text)
+
+    def chapter_header(self, i: int, pov: str) -> str:
+        """
+        :param i: index of the chapter
+        :param pov: first name of the pov character
+        :return: header line of the chapter, without line break
+        """
+        chapter_type = self.chapter_types[i]
+        if chapter_type != 'Chapter':
+            return '{}: {}'.format(chapter_type, pov)
+        number = self.chapter_types[:i + 1].count('Chapter')
+        return 'Chapter {}: {}'.format(number_words(number), pov)
+
+    def write_book(self, file, cast: list):
+        """
+        Writes the text of a book.
+
+        :param file: file object opened in text mode
+        :param cast: result of `cast`
+        """
+        chapter_words = np.full(self.chapters, self.words // self.chapters)
+        chapter_words[:self.words % self.chapters] += 1
+        for i, count in enumerate(chapter_words):
+            pov = self.random.choice(len(cast), p=self.char_probabilities)
+            file.write(self.chapter_header(i, cast[pov][0]) + '\n')
+            paragraphs = list(self._paragraphs(cast, int(count), pov))
+            # segment breaks before some of the paragraphs
+            breaks = min(self.random.randint(0, 4), len(paragraphs) - 1)
+            breaks = set(self.random.choice(np.arange(1, len(paragraphs)), breaks, replace=False)) if breaks > 0 \
+                else set()
+            for j, paragraph in enumerate(paragraphs):
+                if j in breaks:
+                    file.write('* * *\n')
+                file.write(paragraph + '\n')
+
+    def generate(self, title: str, number: int, root: Path = None) -> Path:
+        """
+        Writes a book to '{root}/data/raw/{number}_{title}/book.txt' and the alias files of its characters
+        to '{root}/references/characters/{title}/'.
+
+        :param title: book title, must not contain digits
+        :param number: two digit book number of a novel (e.g. 90 for book 9), several books may share a number
+        :param root: project directory the files are written to (default: PROJECT_DIR)
+        :return: path of the book file
+        """
+        if re.search(r'[0-9]', title) or not 0 <= number < 100:
+            raise ValueError('titles must not contain digits and book numbers must have two digits')
+        if number % 10 != 0:
+            # e.g. 91 is parsed as book 9.1, a novella, which `make data` doesn't load
+            raise ValueError('book number {} is a novella number, use a multiple of 10'.format(number))
+        raw_dir = root / 'data' / 'raw' if root else constants.RAW_DATA_DIR
+        references_dir = root / 'references' if root else constants.REFERENCES_DIR
+
+        cast = self.cast()
+        character_dir = references_dir / 'characters' / title
+        character_dir.mkdir(parents=True, exist_ok=True)
+        for first, last in cast:
+            # same layout as the curated alias files: full name first, the aliases in the following lines
+            aliases = ['{} {}'.format(first, last), first, last, first.upper()]
+            (character_dir / '{}.txt'.format(first)).write_text('\n'.join(aliases), encoding='utf-8')
+
+        book_file = raw_dir / '{:02d}_{}'.format(number, title) / 'book.txt'
+        book_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(book_file, 'w', encoding='utf-8') as f_out:
+            self.write_book(f_out, cast)
+        return book_file
+
+
+def remove_synthetic_books(root: Path = None) -> list:
+    """
+    Removes all generated books and their alias files.
+
+    :param root: project directory the files were written to (default: PROJECT_DIR)
+    :return: list of removed directories
+    """
+    raw_dir = root / 'data' / 'raw' if root else constants.RAW_DATA_DIR
+    references_dir = root / 'references' if root else constants.REFERENCES_DIR
+    directories = list(raw_dir.glob('[0-9][0-9]_{}*'.format(SYNTHETIC_TITLE)))
+    directories += list((references_dir / 'characters').glob('{}*'.format(SYNTHETIC_TITLE)))
+    for directory in directories:
+        shutil.rmtree(directory)
+    return directories
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format=constants.LOGGER_FORMAT)
+    LOG = logging.getLogger(__name__)
+
+    parser = argparse.ArgumentParser(description='Generates synthetic books and character alias files '
+                                                 'to measure how the pipeline scales.')
+    parser.add_argument('--words', type=int, nargs='+', default=[100000],
+                        help='number of words per book, one book is generated per value (default: 100000)')
+    parser.add_argument('--chapters', type=int, default=50, help='number of chapters per book (default: 50)')
+    parser.add_argument('--characters', type=int, default=40, help='number of characters per book (default: 40)')
+    parser.add_argument('--density', type=float, default=0.01,
+                        help='share of words that are mentions of characters (default: 0.01)')
+    parser.add_argument('--number', type=int, default=90,
+                        help='two digit number of all generated books, a multiple of 10 so they are loaded as novels '
+                             '(default: 90)')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the random generator (default: 0)')
+    parser.add_argument('--root', type=Path,
+                        help='project directory the data/raw and references directories are in (default: this project)')
+    parser.add_argument('--clean', action='store_true', help='remove all generated books first')
+    args = parser.parse_args()
+
+    if args.clean:
+        for removed in remove_synthetic_books(args.root):
+            LOG.info('removed %s', removed)
+
+    for i, words in enumerate(args.words):
+        generator = CorpusGenerator(words, args.chapters, args.characters, args.density, seed=args.seed + i)
+        # letters instead of numbers, digits in the directory name would change the parsed book number
+        title = '{} {}'.format(SYNTHETIC_TITLE, chr(ord('A') + i))
+        # all books share the number, the following numbers would be novellas (e.g. 91 -> 9.1)
+        file = generator.generate(title, args.number, args.root)
+        LOG.info('%s: %d words, %d chapters, %d characters -> %s', title, words, args.chapters, args.characters,
+                 file)
@@ -1,91 +1,205 @@
 # -*- coding: utf-8 -*-
+import argparse
 import logging
-import os
-from itertools import product
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from functools import partial
 
 import pandas as pd
 import spacy
 import textacy
+from textacy import extract
 
 from src.common import constants
-from src.common.book_io import save_compressed, load_books, load_missing_books_from_raw
-from src.nlp import CharacterRelationship, CentralityCalculator
+from src.common.book_io import save_interim, load_books, load_missing_books_from_raw
+from src.common.build_cache import BuildCache, book_hash, character_files_hash, content_hash, model_version
+from src.common.character_loader import load_characters_for_book
+from src.common.profiling import Profiler, active_profiler, profile_stage
+from src.database import AnalysisStore
+from src.nlp import RelationshipMatrix, CentralityCalculator, DocCache, TemporalCentrality
 
+LOGGER = logging.getLogger(__name__)
 
-def main(input_filepath):
+# parameters that change the results of a stage (part of the build cache keys)
+RELATIONSHIP_PARAMS = {'window': 15, 'threshold': 2}
+CENTRALITY_PARAMS = {'alpha': 0.1}
+
+
+def main(input_filepath, jobs=1, temporal=None, temporal_format='csv', profile=False):
     """
     Main method that generates all necessary data.
     :param input_filepath: path to the data dir where the books should be stored as .txt or .json.gz
+    :param jobs: number of processes the books are processed with
+    :param temporal: number of chapters per window of the temporal centralities (not calculated if None)
+    :param temporal_format: file format of the temporal centralities ('csv' or 'parquet')
+    :param profile: profile every stage and book, reports are written to {PROJECT_DIR}/reports/profiles,
+                    all books are processed without using the build cache
     """
-    if constants.FORCE_INTERIM_SAVE:
-        LOGGER.info('Save raw TXT as compressed JSON files ...')
-        generate_interim_data()
-
-    LOGGER.info('loading books from "%s" ...', input_filepath.resolve())
-    books = load_books(novels_only=True)
-
-    LOGGER.info('process data ...')
-    generate_processed_data(books, constants.FORCE_PROCESSED_SAVE)
+    if profile and jobs > 1:
+        LOGGER.warning('Books are processed in this process while profiling, --jobs is ignored')
+        jobs = 1
+
+    with Profiler() if profile else nullcontext():
+        if constants.FORCE_INTERIM_SAVE:
+            LOGGER.info('Save raw TXT as interim files ...')
+            with profile_stage('generate_interim_data'):
+                generate_interim_data()
+
+        LOGGER.info('loading books from "%s" ...', input_filepath.resolve())
+        with profile_stage('load_books'):
+            books = load_books(novels_only=True)
+
+        LOGGER.info('process data ...')
+        generate_processed_data(books, constants.FORCE_PROCESSED_SAVE, jobs)
+        if temporal:
+            with profile_stage('calculate_temporal_centralities'):
+                calculate_temporal_centralities(books, temporal, temporal_format)
     LOGGER.info('Done.')
 
 
 def generate_interim_data():
     """
-    Generates gzip json book files form a input txt file
+    Generates interim book files (in the configured INTERIM_FORMAT) form a input txt file
     """
     books = load_missing_books_from_raw(False, [])
     for book in books:
-        save_compressed(book)
+        save_interim(book)
 
 
-def generate_processed_data(books, overwrite):
+def generate_processed_data(books, overwrite, jobs=1):
     """
     Calculates the following stats and writs the results into csv files:
      * character relationships over the books
      * character centralities over the books
      * text stats for all books
+    and stores the books, mentions, relationships and centralities in the analysis database.
 
     :param books: list of Book objects
-    :param overwrite: flag that indicates if files that already exist should be overwritten
+    :param overwrite: recompute all books instead of taking unchanged books from the build cache
+    :param jobs: number of processes the books are processed with, 1 processes them in this process
+    """
+    executor = ProcessPoolExecutor(max_workers=jobs) if jobs > 1 else None
+    try:
+        for stage, args in [(create_relationship_csv, (books, overwrite, executor)),
+                            (calculate_centralities, (books, executor)),
+                            (calculate_text_stats, (books, overwrite, executor)),
+                            (create_database, (books,))]:
+            start = time.perf_counter()
+            with profile_stage(stage.__name__):
+                stage(*args)
+            LOGGER.info('%s took %.2fs', stage.__name__, time.perf_counter() - start)
+    finally:
+        if executor:
+            executor.shutdown()
+
+
+def map_books(executor, func, *iterables) -> list:
+    """
+    Applies the function to every book, either in the process pool or in this process.
+    The results are always returned in the order of the given books.
+
+    :param executor: ProcessPoolExecutor or None
+    :param func: function that is called with one element of each iterable
+    :param iterables: iterables with one element per book
+    :return: list of results
     """
-    create_relationship_csv(books, overwrite)
-    calculate_centralities(books)
-    calculate_text_stats(books, overwrite)
+    if executor:
+        return list(executor.map(func, *iterables))
+    return list(map(func, *iterables))
 
 
-def create_relationship_csv(books, overwrite):
+def cached_map_books(executor, stage: str, titles: list, keys: list, func, *iterables, refresh=False) -> list:
+    """
+    Like `map_books`, but only books whose cache key changed since the last build are processed.
+    The results of all other books are taken from the build cache of the stage.
+
+    :param executor: ProcessPoolExecutor or None
+    :param stage: name of the build stage
+    :param titles: book titles
+    :param keys: build cache key of each book
+    :param func: function that is called with one element of each iterable
+    :param iterables: lists with one element per book
+    :param refresh: process all books and replace their cached results (always done while profiling)
+    :return: list of results
+    """
+    cache = BuildCache(stage)
+    if active_profiler() is not None and not refresh:
+        # cached books would be missing in the profile
+        LOGGER.info('%s: the build cache is not used while profiling', stage)
+        refresh = True
+    results = [None if refresh else cache.get(title, key) for title, key in zip(titles, keys)]
+    missing = [i for i, result in enumerate(results) if result is None]
+    LOGGER.info('%s: %d of %d books changed', stage, len(missing), len(titles))
+
+    missing_iterables = [[iterable[i] for i in missing] for iterable in iterables]
+    if active_profiler() is not None:
+        # each book is profiled on its own, in this process
+        computed = []
+        for i, *args in zip(missing, *missing_iterables):
+            with profile_stage('{}: {}'.format(stage, titles[i])):
+                computed.append(func(*args))
+    else:
+        computed = map_books(executor, func, *missing_iterables)
+    for i, result in zip(missing, computed):
+        cache.put(titles[i], keys[i], result)
+        results[i] = result
+
+    return results
+
+
+def create_relationship_csv(books, overwrite, executor=None):
     """
     Calculates the relationship for each character with every other character in the books.
+    Only books whose text or character files changed are processed, the CSV is written from all results.
     :param books: list of Book objects
-    :param overwrite: flag that indicates if files that already exist should be overwritten
+    :param overwrite: recompute all books instead of taking unchanged books from the build cache
+    :param executor: ProcessPoolExecutor the books are processed with (optional)
+    """
+    output_file = constants.PROCESSED_DATA_DIR / constants.RELATIONSHIP_CSV_FILENAME
+
+    csv_data = {constants.CSV_CHAR_BOOK: [],
+                constants.CSV_CHAR_SRC: [],
+                constants.CSV_CHAR_TRG: [],
+                constants.CSV_CHAR_HITS: [],
+                constants.CSV_CHAR_MENT: [],
+                constants.CSV_CHAR_IMPR: []}
+    titles = [book.title for book in books]
+    keys = [BuildCache.key(book_hash(book), character_files_hash(book.title), **RELATIONSHIP_PARAMS)
+            for book in books]
+    func = partial(book_relationship_data, **RELATIONSHIP_PARAMS)
+    for book_data in cached_map_books(executor, 'relationships', titles, keys, func, books, refresh=overwrite):
+        for column, values in book_data.items():
+            csv_data[column].extend(values)
+
+    dfr = pd.DataFrame(csv_data)
+    dfr.to_csv(output_file, index=False, encoding='utf-8')
+
+
+def book_relationship_data(book, window=15, threshold=2) -> dict:
+    """
+    Calculates the relationship for each character with every other character in one book.
+    :param book: Book object
+    :param window: lookup window of words before and after character mention
+    :param threshold: amount of mentions that will count as sufficient relationship
+    :return: relationship csv columns of the book
     """
     from src.common.character_loader import load_characters_for_book
 
-    output_file = constants.PROCESSED_DATA_DIR / constants.RELATIONSHIP_CSV_FILENAME
+    csv_data = {constants.CSV_CHAR_BOOK: [],
+                constants.CSV_CHAR_SRC: [],
+                constants.CSV_CHAR_TRG: [],
+                constants.CSV_CHAR_HITS: [],
+                constants.CSV_CHAR_MENT: [],
+                constants.CSV_CHAR_IMPR: []}
+    rel = RelationshipMatrix(load_characters_for_book(book.title), window, threshold)
+    rel.find_in_book(book)
+    for char1, char2, result in rel.relationships():
+        LOGGER.info('found pairing %s x %s in %s', char1, char2, book.title)
+        add_relationship_data(csv_data, result, book.title, char1, char2)
+        add_relationship_data(csv_data, result, book.title, char2, char1)
 
-    if not os.path.exists(output_file) or overwrite:
-        csv_data = {constants.CSV_CHAR_BOOK: [],
-                    constants.CSV_CHAR_SRC: [],
-                    constants.CSV_CHAR_TRG: [],
-                    constants.CSV_CHAR_HITS: [],
-                    constants.CSV_CHAR_MENT: [],
-                    constants.CSV_CHAR_IMPR: []}
-        for book in books:
-            chars = load_characters_for_book(book.title)
-            prod = []
-            for prod_tpl in product(chars, chars):
-                if prod_tpl[0] != prod_tpl[1] and [prod_tpl[1], prod_tpl[0]] not in prod:
-                    prod.append(list(prod_tpl))
-            for char_tuple in prod:
-                rel = CharacterRelationship(char_tuple[0], char_tuple[1])
-                rel.find_in_book(book)
-                if rel.have_relationship():
-                    LOGGER.info('found pairing %s x %s in %s', char_tuple[0], char_tuple[1], book.title)
-                    add_relationship_data(csv_data, rel.result, book.title, char_tuple[0], char_tuple[1])
-                    add_relationship_data(csv_data, rel.result, book.title, char_tuple[1], char_tuple[0])
-
-        dfr = pd.DataFrame(csv_data)
-        dfr.to_csv(output_file, index=False, encoding='utf-8')
+    return csv_data
 
 
 def add_relationship_data(data, dist, book_title, source, target):
@@ -105,85 +219,213 @@ def add_relationship_data(data, dist, book_title, source, target):
     data[constants.CSV_CHAR_IMPR].append(dist[constants.CSV_CHAR_HITS] / dist[source.ref_name])
 
 
-def calculate_centralities(books):
+def calculate_centralities(books, executor=None):
     """
     Calculates the centralities for each character in every given book.
     :param books: list of Book objects
+    :param executor: ProcessPoolExecutor the books are processed with (optional)
     """
     relationship_df = pd.read_csv(constants.PROCESSED_DATA_DIR / constants.RELATIONSHIP_CSV_FILENAME)
 
-    for book in books:
-        output_file = constants.PROCESSED_DATA_DIR / constants.CENTRALITY_CSV_FILENAME.format(book.title)
-        characters = sorted(set(relationship_df[(relationship_df.book == book.title)].source))
-        data = {}
-        mentions = {}
-        # create a dictionary like:
-        # {
-        #   'sourceCharacter': {
-        #     'targetCharacter 1': 0.1232,
-        #     'targetCharacter 2': 0.23,
-        #     ...
-        #   }
-        # }
-
-        for character in characters:
-            data.update({character: {}})
-            mentions.update({character: {}})
-            for sdf in relationship_df[(relationship_df.book == book.title) & (relationship_df.source == character)]:
-                data[character].update({sdf.target: sdf.importance})
-                mentions.update({character: sdf.mentions})
-
-        centrality = CentralityCalculator(characters, data)
-        LOGGER.info('Calculate centralities for %s', book.title)
-
-        dfs = [
-            pd.DataFrame.from_dict(mentions, orient='index', columns=[constants.CSV_CHAR_MENT]),
-            pd.DataFrame.from_dict(centrality.text_rank_nx(), orient='index', columns=[constants.CENT_CSV_TR]),
-            pd.DataFrame.from_dict(centrality.text_rank(), orient='index', columns=[constants.CENT_CSV_OTR]),
-            pd.DataFrame.from_dict(centrality.eigenvector_nx(), orient='index', columns=[constants.CENT_CSV_EV]),
-            pd.DataFrame.from_dict(centrality.eigenvector(), orient='index', columns=[constants.CENT_CSV_OEV]),
-            pd.DataFrame.from_dict(centrality.katz_centrality_nx(), orient='index', columns=[constants.CENT_CSV_KATZ]),
-            pd.DataFrame.from_dict(centrality.katz_centrality(), orient='index', columns=[constants.CENT_CSV_OKATZ]),
-            pd.DataFrame.from_dict(centrality.degree(), orient='index', columns=[constants.CENT_CSV_DEG]),
-            pd.DataFrame.from_dict(centrality.harmonic(), orient='index', columns=[constants.CENT_CSV_HARM]),
-            pd.DataFrame.from_dict(centrality.closeness(), orient='index', columns=[constants.CENT_CSV_CLSNS]),
-            pd.DataFrame.from_dict(centrality.betweenness_nx(), orient='index', columns=[constants.CENT_CSV_BTWN])
-        ]
-
-        out_df = pd.concat(dfs, join='inner', axis=1).sort_values(by=constants.CSV_CHAR_MENT, ascending=False)
+    titles = [book.title for book in books]
+    book_dfs = [relationship_df[relationship_df.book == title] for title in titles]
+    keys = [BuildCache.key(content_hash(book_df.to_csv(index=False)), **CENTRALITY_PARAMS) for book_df in book_dfs]
+    func = partial(book_centralities, **CENTRALITY_PARAMS)
+    out_dfs = cached_map_books(executor, 'centralities', titles, keys, func, titles, book_dfs)
+    for title, out_df in zip(titles, out_dfs):
+        output_file = constants.PROCESSED_DATA_DIR / constants.CENTRALITY_CSV_FILENAME.format(title)
         out_df.to_csv(output_file, encoding='utf-8', index_label=constants.CENT_CSV_ID)
 
 
-def calculate_text_stats(books, overwrite):
+def book_centralities(title, relationship_df, alpha=0.1) -> pd.DataFrame:
+    """
+    Calculates the centralities for each character in one book.
+    :param title: book title
+    :param relationship_df: relationships of the book
+    :param alpha: attenuation factor of the katz centrality
+    :return: data frame with one row per character and one column per centrality
+    """
+    characters = sorted(set(relationship_df.source))
+    data = {}
+    mentions = {}
+    # create a dictionary like:
+    # {
+    #   'sourceCharacter': {
+    #     'targetCharacter 1': 0.1232,
+    #     'targetCharacter 2': 0.23,
+    #     ...
+    #   }
+    # }
+
+    for character in characters:
+        data.update({character: {}})
+        mentions.update({character: {}})
+        for sdf in relationship_df[relationship_df.source == character].itertuples():
+            data[character].update({sdf.target: sdf.importance})
+            mentions.update({character: sdf.mentions})
+
+    centrality = CentralityCalculator(characters, data)
+    LOGGER.info('Calculate centralities for %s', title)
+
+    centrality_df = centrality.compute_all(alpha=alpha)
+    LOGGER.debug('Centrality timings for %s: %s', title, centrality_df.attrs['timings'])
+
+    mentions_df = pd.DataFrame.from_dict(mentions, orient='index', columns=[constants.CSV_CHAR_MENT])
+    return pd.concat([mentions_df, centrality_df], join='inner', axis=1).sort_values(by=constants.CSV_CHAR_MENT,
+                                                                                      ascending=False)
+
+
+def create_database(books):
+    """
+    Loads the books, the mentions of their characters, the relationships and the centralities
+    into the analysis database (see AnalysisStore).
+    :param books: list of Book objects
+    """
+    relationship_df = pd.read_csv(constants.PROCESSED_DATA_DIR / constants.RELATIONSHIP_CSV_FILENAME)
+
+    with AnalysisStore() as store:
+        store.add_books(books)
+        for book in books:
+            LOGGER.info('Store mentions and centralities of %s', book.title)
+            characters = load_characters_for_book(book.title)
+            store.add_characters(characters)
+            store.add_mentions(book, characters)
+            centrality_file = constants.PROCESSED_DATA_DIR / constants.CENTRALITY_CSV_FILENAME.format(book.title)
+            store.add_centralities(book.title, pd.read_csv(centrality_file, index_col=constants.CENT_CSV_ID))
+        store.add_relationships(relationship_df[relationship_df.book.isin([book.title for book in books])])
+
+
+def calculate_temporal_centralities(books, chapters, output_format='csv'):
+    """
+    Calculates the centralities of the characters for every window of chapters over all given books
+    and writes them in long format (one row per book, chapter and character).
+    :param books: list of Book objects
+    :param chapters: number of consecutive chapters in a window
+    :param output_format: 'csv' or 'parquet' (requires pyarrow or fastparquet)
+    """
+    from src.common.character_loader import load_characters_for_book
+
+    books = sorted(books, key=lambda b: b.number)
+    characters = dict()
+    for book in books:
+        for character in load_characters_for_book(book.title):
+            characters.setdefault(character.ref_name, character)
+
+    LOGGER.info('Calculate temporal centralities over %d books with windows of %d chapters', len(books), chapters)
+    temporal = TemporalCentrality(sorted(characters.values(), key=lambda c: c.ref_name), chapters,
+                                  alpha=CENTRALITY_PARAMS['alpha'], **RELATIONSHIP_PARAMS)
+    out_df = temporal.calculate(books)
+
+    output_file = constants.PROCESSED_DATA_DIR / constants.TEMPORAL_CENTRALITY_FILENAME.format(output_format)
+    if output_format == 'parquet':
+        out_df.to_parquet(output_file, index=False)
+    else:
+        out_df.to_csv(output_file, index=False, encoding='utf-8')
+
+
+def calculate_text_stats(books, overwrite, executor=None):
     """
     Calculates the text stats of each book. Uses Textacy
+    Only books whose text or spaCy model changed are processed, the CSV is written from all results.
     :param books: list of Book objects
-    :param overwrite: flag that indicates if files that already exist should be overwritten
+    :param overwrite: recompute all books instead of taking unchanged books from the build cache
+    :param executor: ProcessPoolExecutor the books are processed with (optional)
     """
     output_file = constants.PROCESSED_DATA_DIR / constants.TEXT_STATS_CSV_FILENAME
 
-    if not os.path.exists(output_file) or overwrite:
-        text_stats_list = list()
+    titles = [book.title for book in books]
+    model = model_version(constants.MODEL_DIR)
+    keys = [BuildCache.key(book_hash(book), str(constants.MODEL_DIR), model, chunked=constants.TEXT_STATS_CHUNKED)
+            for book in books]
+    func = partial(book_text_stats, chunked=constants.TEXT_STATS_CHUNKED, n_process=constants.TEXT_STATS_PROCESSES)
+    text_stats_list = cached_map_books(executor, 'text_stats', titles, keys, func, books, refresh=overwrite)
+
+    text_df = pd.DataFrame(text_stats_list)
+    text_df.to_csv(output_file, index=False, encoding='utf-8')
 
-        nlp = spacy.load(constants.MODEL_DIR, disable=["tagger", "ner", "tokenizer", "textcat"])
-        for book in books:
-            LOGGER.info('Calculate TextStats %s', book.title)
-            text = book.content()
-            nlp.max_length = len(text)
-            doc = nlp(text)
-            text_stats = textacy.TextStats(doc)
-            book_properties = dict()
-            book_properties['book'] = book.title
-            book_properties.update(text_stats.readability_stats)
-            book_properties.update(text_stats.basic_counts)
-            text_stats_list.append(book_properties)
 
-        text_df = pd.DataFrame(text_stats_list)
-        text_df.to_csv(output_file, index=False, encoding='utf-8')
+_TEXT_STATS_NLP = None
+
+
+class ChunkedTextStats(textacy.TextStats):
+    """
+    TextStats of a text that was parsed in several docs (e.g. one per chapter).
+
+    The basic counts of all docs are summed up (the distinct words are merged),
+    the readability stats are calculated from these sums like for a single doc.
+    """
+
+    def __init__(self, docs):
+        """
+        :param docs: iterable of spaCy Docs
+        """
+        self.lang = None
+        self.n_sents = 0
+        self.n_words = 0
+        self.n_chars = 0
+        self.n_long_words = 0
+        self.n_syllables = 0
+        self.n_monosyllable_words = 0
+        self.n_polysyllable_words = 0
+        unique_words = set()
+        for doc in docs:
+            stats = textacy.TextStats(doc)
+            self.lang = stats.lang
+            self.n_sents += stats.n_sents or 0
+            self.n_words += stats.n_words
+            self.n_chars += stats.n_chars
+            self.n_long_words += stats.n_long_words
+            self.n_syllables += stats.n_syllables
+            self.n_monosyllable_words += stats.n_monosyllable_words
+            self.n_polysyllable_words += stats.n_polysyllable_words
+            unique_words.update(word.lower for word in
+                                extract.words(doc, filter_punct=True, filter_stops=False, filter_nums=False))
+        self.n_unique_words = len(unique_words)
+
+
+def book_text_stats(book, chunked=False, n_process=1) -> dict:
+    """
+    Calculates the text stats of one book. Uses Textacy
+    :param book: Book object
+    :param chunked: parse the book chapter by chapter (cached with DocCache) instead of as one doc,
+                    only sentences that span two chapters are counted differently
+    :param n_process: number of processes spaCy parses the chapters with (chunked mode only)
+    :return: dictionary with the book title, readability stats and basic counts
+    """
+    global _TEXT_STATS_NLP
+    if _TEXT_STATS_NLP is None:
+        # loaded once per process
+        _TEXT_STATS_NLP = spacy.load(constants.MODEL_DIR, disable=["tagger", "ner", "tokenizer", "textcat"])
+    nlp = _TEXT_STATS_NLP
+
+    LOGGER.info('Calculate TextStats %s', book.title)
+    if chunked:
+        text_stats = ChunkedTextStats(DocCache(nlp).chapter_docs(book, n_process=n_process))
+    else:
+        text = book.content()
+        nlp.max_length = len(text)
+        doc = nlp(text)
+        text_stats = textacy.TextStats(doc)
+    book_properties = dict()
+    book_properties['book'] = book.title
+    book_properties.update(text_stats.readability_stats)
+    book_properties.update(text_stats.basic_counts)
+
+    return book_properties
 
 
 if __name__ == '__main__':
     logging.basicConfig(level=logging.INFO, format=constants.LOGGER_FORMAT)
-    LOGGER = logging.getLogger(__name__)
 
-    main(constants.RAW_DATA_DIR)
+    parser = argparse.ArgumentParser(description='Generates the interim and processed data sets.')
+    parser.add_argument('--jobs', type=int, default=1,
+                        help='number of processes the books are processed with (default: 1)')
+    parser.add_argument('--temporal', type=int, metavar='CHAPTERS',
+                        help='also calculate the centralities over time, with windows of CHAPTERS chapters')
+    parser.add_argument('--temporal-format', choices=['csv', 'parquet'], default='csv',
+                        help='file format of the temporal centralities (default: csv)')
+    parser.add_argument('--profile', action='store_true',
+                        help='record cProfile stats and memory allocations of every stage and book in reports/profiles')
+    args = parser.parse_args()
+
+    main(constants.RAW_DATA_DIR, args.jobs, args.temporal, args.temporal_format, args.profile)
@@ -0,0 +1,253 @@
+import sqlite3
+
+from src.common import constants
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS books (
+    id INTEGER PRIMARY KEY,
+    title TEXT NOT NULL UNIQUE,
+    number REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS chapters (
+    id INTEGER PRIMARY KEY,
+    book_id INTEGER NOT NULL REFERENCES books(id) ON DELETE CASCADE,
+    number INTEGER NOT NULL,
+    pov TEXT NOT NULL,
+    chapter_type TEXT NOT NULL,
+    UNIQUE (book_id, number)
+);
+CREATE TABLE IF NOT EXISTS segments (
+    id INTEGER PRIMARY KEY,
+    chapter_id INTEGER NOT NULL REFERENCES chapters(id) ON DELETE CASCADE,
+    number INTEGER NOT NULL,
+    words INTEGER NOT NULL,
+    content TEXT NOT NULL,
+    UNIQUE (chapter_id, number)
+);
+CREATE TABLE IF NOT EXISTS characters (
+    id INTEGER PRIMARY KEY,
+    ref_name TEXT NOT NULL UNIQUE,
+    aliases TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS mentions (
+    chapter_id INTEGER NOT NULL REFERENCES chapters(id) ON DELETE CASCADE,
+    character_id INTEGER NOT NULL REFERENCES characters(id),
+    mentions INTEGER NOT NULL,
+    PRIMARY KEY (chapter_id, character_id)
+);
+CREATE INDEX IF NOT EXISTS mentions_character ON mentions (character_id);
+CREATE TABLE IF NOT EXISTS relationships (
+    book_id INTEGER NOT NULL REFERENCES books(id) ON DELETE CASCADE,
+    source_id INTEGER NOT NULL REFERENCES characters(id),
+    target_id INTEGER NOT NULL REFERENCES characters(id),
+    hits INTEGER NOT NULL,
+    mentions INTEGER NOT NULL,
+    importance REAL NOT NULL,
+    PRIMARY KEY (book_id, source_id, target_id)
+);
+CREATE INDEX IF NOT EXISTS relationships_source ON relationships (source_id);
+CREATE TABLE IF NOT EXISTS centralities (
+    book_id INTEGER NOT NULL REFERENCES books(id) ON DELETE CASCADE,
+    character_id INTEGER NOT NULL REFERENCES characters(id),
+    metric TEXT NOT NULL,
+    value REAL,
+    PRIMARY KEY (book_id, metric, character_id)
+);
+CREATE INDEX IF NOT EXISTS centralities_ranking ON centralities (book_id, metric, value);
+'''
+
+
+class AnalysisStore:
+    """
+    Stores the books and the results of the analysis (mentions, relationships and centralities)
+    in an indexed SQLite database, so single values can be queried without reading whole CSV files.
+
+    Loading data of a book replaces the data that was stored for it before.
+    """
+
+    def __init__(self, path=None):
+        """
+        :param path: path of the SQLite file (default: {PROJECT_DIR}/data/processed/analysis.sqlite)
+        """
+        self.path = path or constants.PROCESSED_DATA_DIR / constants.DATABASE_FILENAME
+        self.connection = sqlite3.connect(str(self.path))
+        self.connection.execute('PRAGMA foreign_keys = ON')
+        self.connection.executescript(_SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        self.connection.close()
+
+    def _book_id(self, title: str) -> int:
+        row = self.connection.execute('SELECT id FROM books WHERE title = ?', (title,)).fetchone()
+        if row is None:
+            raise KeyError('book "{}" is not stored'.format(title))
+        return row[0]
+
+    def _character_ids(self, ref_names) -> dict:
+        """
+        Stores characters that are only known by their reference name.
+
+        :param ref_names: iterable of reference names
+        :return: { ref_name: id } dictionary of the given characters
+        """
+        ref_names = set(ref_names)
+        self.connection.executemany('INSERT OR IGNORE INTO characters (ref_name, aliases) VALUES (?, ?)',
+                                    [(name, name) for name in ref_names])
+        rows = self.connection.execute('SELECT ref_name, id FROM characters')
+        return {name: char_id for (name, char_id) in rows if name in ref_names}
+
+    def add_books(self, books: list):
+        """
+        Stores books with all their chapters and segments.
+
+        :param books: list of Book objects
+        """
+        with self.connection:
+            for book in books:
+                self.connection.execute('DELETE FROM books WHERE title = ?', (book.title,))
+                book_id = self.connection.execute('INSERT INTO books (title, number) VALUES (?, ?)',
+                                                  (book.title, book.number)).lastrowid
+                self.connection.executemany(
+                    'INSERT INTO chapters (book_id, number, pov, chapter_type) VALUES (?, ?, ?, ?)',
+                    [(book_id, chapter.number, chapter.pov.ref_name, chapter.chapter_type.name)
+                     for chapter in book.chapters])
+                chapter_ids = dict(self.connection.execute('SELECT number, id FROM chapters WHERE book_id = ?',
+                                                           (book_id,)))
+                self.connection.executemany(
+                    'INSERT INTO segments (chapter_id, number, words, content) VALUES (?, ?, ?, ?)',
+                    [(chapter_ids[chapter.number], segment.number, segment.count_words(), segment.content())
+                     for chapter in book.chapters for segment in chapter.segments])
+
+    def add_characters(self, characters: list):
+        """
+        Stores characters with their aliases.
+
+        :param characters: list of Character objects
+        """
+        with self.connection:
+            self.connection.executemany(
+                'INSERT INTO characters (ref_name, aliases) VALUES (?, ?) '
+                'ON CONFLICT (ref_name) DO UPDATE SET aliases = excluded.aliases',
+                [(char.ref_name, '\n'.join(char.alt_names)) for char in characters])
+
+    def add_mentions(self, book, characters: list):
+        """
+        Counts and stores the mentions of the given characters in each chapter of a stored book.
+
+        :param book: Book object
+        :param characters: list of Character objects
+        """
+        from src.object.AliasMatcher import AliasMatcher
+
+        matcher = AliasMatcher(characters)
+        rows = []
+        for chapter in book.chapters:
+            counts = dict.fromkeys(matcher.ref_names, 0)
+            for segment in chapter.segments:
+                for ref_name, indices in matcher.find(segment.words()).items():
+                    counts[ref_name] += len(indices)
+            rows += [(chapter.number, ref_name, count) for ref_name, count in counts.items() if count > 0]
+
+        with self.connection:
+            book_id = self._book_id(book.title)
+            char_ids = self._character_ids(matcher.ref_names)
+            chapter_ids = dict(self.connection.execute('SELECT number, id FROM chapters WHERE book_id = ?',
+                                                       (book_id,)))
+            self.connection.execute('DELETE FROM mentions WHERE chapter_id IN '
+                                    '(SELECT id FROM chapters WHERE book_id = ?)', (book_id,))
+            self.connection.executemany('INSERT INTO mentions (chapter_id, character_id, mentions) VALUES (?, ?, ?)',
+                                        [(chapter_ids[number], char_ids[ref_name], count)
+                                         for (number, ref_name, count) in rows])
+
+    def add_relationships(self, relationship_df):
+        """
+        Stores relationships of stored books.
+
+        :param relationship_df: data frame in the form of 'character_relationships.csv'
+        """
+        with self.connection:
+            char_ids = self._character_ids(set(relationship_df[constants.CSV_CHAR_SRC]) |
+                                           set(relationship_df[constants.CSV_CHAR_TRG]))
+            for title, book_df in relationship_df.groupby(constants.CSV_CHAR_BOOK):
+                book_id = self._book_id(title)
+                self.connection.execute('DELETE FROM relationships WHERE book_id = ?', (book_id,))
+                self.connection.executemany(
+                    'INSERT INTO relationships (book_id, source_id, target_id, hits, mentions, importance) '
+                    'VALUES (?, ?, ?, ?, ?, ?)',
+                    [(book_id, char_ids[row.source], char_ids[row.target], int(row.hits), int(row.mentions),
+                      float(row.importance)) for row in book_df.itertuples()])
+
+    def add_centralities(self, title: str, centrality_df):
+        """
+        Stores the centralities of the characters of a stored book.
+
+        :param title: book title
+        :param centrality_df: data frame with one row per character (index) and one column per centrality
+        """
+        metrics = [column for column in centrality_df.columns if column != constants.CSV_CHAR_MENT]
+        with self.connection:
+            book_id = self._book_id(title)
+            char_ids = self._character_ids(centrality_df.index)
+            self.connection.execute('DELETE FROM centralities WHERE book_id = ?', (book_id,))
+            self.connection.executemany(
+                'INSERT INTO centralities (book_id, character_id, metric, value) VALUES (?, ?, ?, ?)',
+                [(book_id, char_ids[name], metric, float(value))
+                 for metric in metrics for (name, value) in centrality_df[metric].items()])
+
+    def top_characters(self, title: str, metric: str, k: int = 10) -> list:
+        """
+        :param title: book title
+        :param metric: name of the centrality (e.g. 'degree')
+        :param k: number of characters
+        :return: list of (ref_name, value) tuples of the k most central characters of the book
+        """
+        return self.connection.execute(
+            'SELECT characters.ref_name, centralities.value FROM centralities '
+            'JOIN books ON books.id = centralities.book_id '
+            'JOIN characters ON characters.id = centralities.character_id '
+            'WHERE books.title = ? AND centralities.metric = ? '
+            'ORDER BY centralities.value DESC LIMIT ?', (title, metric, k)).fetchall()
+
+    def centralities(self, title: str, ref_name: str) -> dict:
+        """
+        :param title: book title
+        :param ref_name: reference name of the character
+        :return: { metric: value } dictionary of all centralities of the character in the book
+        """
+        return dict(self.connection.execute(
+            'SELECT centralities.metric, centralities.value FROM centralities '
+            'JOIN books ON books.id = centralities.book_id '
+            'JOIN characters ON characters.id = centralities.character_id '
+            'WHERE books.title = ? AND characters.ref_name = ?', (title, ref_name)))
+
+    def edges(self, ref_name: str) -> list:
+        """
+        :param ref_name: reference name of the character
+        :return: list of (book title, target, hits, importance) tuples of all relationships of the character,
+                 ordered by book number
+        """
+        return self.connection.execute(
+            'SELECT books.title, targets.ref_name, relationships.hits, relationships.importance '
+            'FROM relationships '
+            'JOIN books ON books.id = relationships.book_id '
+            'JOIN characters AS sources ON sources.id = relationships.source_id '
+            'JOIN characters AS targets ON targets.id = relationships.target_id '
+            'WHERE sources.ref_name = ? ORDER BY books.number, relationships.hits DESC', (ref_name,)).fetchall()
+
+    def mentions(self, ref_name: str) -> list:
+        """
+        :param ref_name: reference name of the character
+        :return: list of (book title, chapter number, mentions) tuples, ordered by book and chapter
+        """
+        return self.connection.execute(
+            'SELECT books.title, chapters.number, mentions.mentions FROM mentions '
+            'JOIN chapters ON chapters.id = mentions.chapter_id '
+            'JOIN books ON books.id = chapters.book_id '
+            'JOIN characters ON characters.id = mentions.character_id '
+            'WHERE characters.ref_name = ? ORDER BY books.number, chapters.number', (ref_name,)).fetchall()
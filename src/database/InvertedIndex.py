@@ -0,0 +1,211 @@
+import json
+
+import numpy as np
+
+from src.common import constants
+from src.object.Segment import WORD_PATTERN
+from src.object.TokenStream import TokenStream
+
+_META_FILE = 'meta.json'
+# numpy arrays of the index, loaded memory mapped
+_ARRAYS = ['tokens', 'terms', 'segments', 'postings', 'term_offsets']
+
+
+def split_query(query: str) -> list:
+    """
+    Splits a query into the terms of the index (words in lower case, see Segment.words()).
+
+    :param query: word or phrase
+    :return: list of terms
+    """
+    return [word.lower() for word in WORD_PATTERN.findall(query.replace('’', '\''))]
+
+
+class Hit:
+    """
+    Represents an occurrence of a word or phrase in a Segment
+    """
+
+    def __init__(self, book: str, chapter: int, segment: int, offset: int, left=None, match=None, right=None):
+        """
+        :param book: book title
+        :param chapter: chapter number
+        :param segment: segment number in the chapter
+        :param offset: position of the first matched word in the segment
+        :param left: words before the match (keyword in context only)
+        :param match: matched words (keyword in context only)
+        :param right: words after the match (keyword in context only)
+        """
+        self.book = book
+        self.chapter = chapter
+        self.segment = segment
+        self.offset = offset
+        self.left = left
+        self.match = match
+        self.right = right
+
+    def kwic_line(self, width: int = 40) -> str:
+        """
+        :param width: number of characters shown on each side of the match
+        :return: the hit as aligned keyword in context line
+        """
+        left = ' '.join(self.left or [])[-width:]
+        right = ' '.join(self.right or [])[:width]
+        return '{:>{w}} [{}] {:<{w}}'.format(left, ' '.join(self.match or []), right, w=width)
+
+    def __repr__(self):
+        return '{} {}/{}/{}'.format(self.book, self.chapter, self.segment, self.offset)
+
+
+class InvertedIndex:
+    """
+    Positional inverted index of the words of several books, stored as numpy arrays in a directory.
+
+    All words of all books are stored as one sequence of token ids; the postings of a term are the positions
+    of its (case insensitive) occurrences in that sequence. Position lookups and context slices
+    only touch the memory mapped parts of the arrays that are needed.
+    """
+
+    def __init__(self, directory=None):
+        """
+        Opens an index that was stored with `build`.
+
+        :param directory: directory of the index (default: {PROJECT_DIR}/data/interim/index)
+        """
+        self.directory = directory or constants.INDEX_DIR
+        meta = json.loads((self.directory / _META_FILE).read_text(encoding='utf-8'))
+        self.titles = meta['titles']
+        self.book_hashes = meta['book_hashes']
+        self.vocabulary = meta['vocabulary']
+        self.term_ids = {term: i for i, term in enumerate(meta['terms'])}
+        for name in _ARRAYS:
+            setattr(self, name, np.load(self.directory / '{}.npy'.format(name), mmap_mode='r'))
+        # position of the first word of each segment, followed by the total number of words
+        self.starts = np.append(self.segments[:, 0], len(self.tokens))
+
+    @staticmethod
+    def build(books: list, directory=None):
+        """
+        Indexes all words of the given books and stores the index.
+
+        :param books: list of Book objects
+        :param directory: directory of the index (default: {PROJECT_DIR}/data/interim/index)
+        :return: the stored InvertedIndex
+        """
+        from src.common.build_cache import book_hash
+
+        directory = directory or constants.INDEX_DIR
+        surface_ids = dict()
+        tokens = []
+        segments = []
+        for book_nr, book in enumerate(books):
+            stream = TokenStream.from_book(book)
+            ids = np.array([surface_ids.setdefault(word, len(surface_ids)) for word in stream.vocabulary],
+                           dtype=np.int32)
+            start = sum(len(t) for t in tokens)
+            tokens.append(ids[np.asarray(stream.ids, dtype=np.int64)])
+            offsets = iter(stream.offsets)
+            for chapter in book.chapters:
+                for segment in chapter.segments:
+                    segments.append((start + next(offsets), book_nr, chapter.number, segment.number))
+
+        vocabulary = list(surface_ids)
+        term_ids = dict()
+        terms = np.array([term_ids.setdefault(word.lower(), len(term_ids)) for word in vocabulary], dtype=np.int32)
+        tokens = np.concatenate(tokens) if tokens else np.zeros(0, dtype=np.int32)
+        token_terms = terms[tokens]
+        # positions grouped by term, in text order within each term
+        postings = np.argsort(token_terms, kind='stable').astype(np.int64)
+        term_offsets = np.zeros(len(term_ids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(token_terms, minlength=len(term_ids)), out=term_offsets[1:])
+
+        directory.mkdir(parents=True, exist_ok=True)
+        arrays = {'tokens': tokens, 'terms': terms, 'segments': np.array(segments, dtype=np.int64).reshape(-1, 4),
+                  'postings': postings, 'term_offsets': term_offsets}
+        for name in _ARRAYS:
+            np.save(directory / '{}.npy'.format(name), arrays[name])
+        meta = {'titles': [book.title for book in books], 'book_hashes': [book_hash(book) for book in books],
+                'vocabulary': vocabulary, 'terms': list(term_ids)}
+        (directory / _META_FILE).write_text(json.dumps(meta), encoding='utf-8')
+        return InvertedIndex(directory)
+
+    def is_current(self, books: list) -> bool:
+        """
+        :param books: list of Book objects
+        :return: True if the index was built from exactly these books in their current state
+        """
+        from src.common.build_cache import book_hash
+
+        return self.book_hashes == [book_hash(book) for book in books]
+
+    def _postings(self, term: str) -> np.ndarray:
+        term_id = self.term_ids.get(term)
+        if term_id is None:
+            return np.zeros(0, dtype=np.int64)
+        return np.asarray(self.postings[self.term_offsets[term_id]:self.term_offsets[term_id + 1]])
+
+    def positions(self, query: str) -> np.ndarray:
+        """
+        :param query: word or phrase
+        :return: sorted positions of the first word of each occurrence of the phrase within a segment
+        """
+        terms = split_query(query)
+        if not terms:
+            return np.zeros(0, dtype=np.int64)
+        positions = self._postings(terms[0])
+        for i, term in enumerate(terms[1:], 1):
+            if len(positions) == 0:
+                break
+            positions = positions[np.isin(positions + i, self._postings(term), assume_unique=True)]
+        # phrases must not continue into the next segment
+        same_segment = (np.searchsorted(self.starts, positions, side='right') ==
+                        np.searchsorted(self.starts, positions + len(terms) - 1, side='right'))
+        return positions[same_segment]
+
+    def count(self, query: str) -> int:
+        """
+        :param query: word or phrase
+        :return: number of occurrences of the phrase
+        """
+        return len(self.positions(query))
+
+    def _words(self, start: int, end: int) -> list:
+        return [self.vocabulary[i] for i in self.tokens[start:end]]
+
+    def find(self, query: str, context: int = None, books: list = None) -> list:
+        """
+        Finds all occurrences of a word or phrase (case insensitive).
+
+        :param query: word or phrase
+        :param context: number of words before and after each match (keyword in context), None for no context
+        :param books: titles of the books to search (default: all books)
+        :return: list of Hit objects in text order
+        """
+        length = len(split_query(query))
+        positions = self.positions(query)
+        indices = np.searchsorted(self.starts, positions, side='right') - 1
+        hits = []
+        for position, index in zip(positions.tolist(), indices.tolist()):
+            start, book_nr, chapter, segment = self.segments[index].tolist()
+            title = self.titles[book_nr]
+            if books is not None and title not in books:
+                continue
+            hit = Hit(title, chapter, segment, position - start)
+            if context is not None:
+                end = int(self.starts[index + 1])
+                hit.left = self._words(max(start, position - context), position)
+                hit.match = self._words(position, position + length)
+                hit.right = self._words(position + length, min(end, position + length + context))
+            hits.append(hit)
+        return hits
+
+    def kwic(self, query: str, context: int = 5, books: list = None) -> list:
+        """
+        Keyword in context concordance of a word or phrase.
+
+        :param query: word or phrase
+        :param context: number of words shown before and after each match (within the segment)
+        :param books: titles of the books to search (default: all books)
+        :return: list of Hit objects with left, match and right words
+        """
+        return self.find(query, context, books)
@@ -0,0 +1,2 @@
+from .AnalysisStore import *
+from .InvertedIndex import *
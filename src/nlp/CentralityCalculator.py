@@ -1,13 +1,41 @@
+import time
+from functools import partial
+
 import networkx as nx
 import numpy as np
-from scipy.sparse.csgraph import floyd_warshall
-
-from src.nlp.util import norm_to_one
+import pandas as pd
+from scipy import sparse
+from scipy.sparse.csgraph import shortest_path
+from scipy.sparse.linalg import spsolve
+
+from src.common import constants
+from src.nlp.util import norm_to_one, power_iteration
+
+# metric name -> (method name, shared intermediates the method needs)
+CENTRALITY_METRICS = {
+    constants.CENT_CSV_TR: ('text_rank_nx', ('graph',)),
+    constants.CENT_CSV_OTR: ('text_rank', ('normalized',)),
+    constants.CENT_CSV_EV: ('eigenvector_nx', ('graph',)),
+    constants.CENT_CSV_OEV: ('eigenvector', ('normalized',)),
+    constants.CENT_CSV_KATZ: ('katz_centrality_nx', ('graph',)),
+    constants.CENT_CSV_OKATZ: ('katz_centrality', ('adjacency',)),
+    constants.CENT_CSV_DEG: ('degree', ('adjacency',)),
+    constants.CENT_CSV_HARM: ('harmonic', ('distances',)),
+    constants.CENT_CSV_CLSNS: ('closeness', ('distances',)),
+    constants.CENT_CSV_BTWN: ('betweenness_nx', ('graph',))
+}
+# metrics that take the attenuation factor alpha
+CENTRALITY_ALPHA_METRICS = {constants.CENT_CSV_KATZ, constants.CENT_CSV_OKATZ}
+# metrics that can start with a previous result
+CENTRALITY_WARM_START_METRICS = {constants.CENT_CSV_OTR, constants.CENT_CSV_OEV}
 
 
 class CentralityCalculator:
     """
     Provides several algorithms that calculate the centrality of an adjacency matrix
+
+    The adjacency matrix is a sparse (CSR) matrix that is built once and shared by all algorithms,
+    so graphs with thousands of nodes can be used.
     """
 
     def __init__(self, nodes: list, edges: dict):
@@ -19,38 +47,82 @@ class CentralityCalculator:
         """
         self.damping = 0.85  # damping coefficient
         self.min_diff = 1e-8  # convergence threshold
+        self.residual = 'l1'  # norm of the residual that is compared to the convergence threshold ('l1' or 'max')
         self.steps = 1000  # iteration steps
         self.nodes = set(nodes)
         self.edge_weights = edges
         self.node_pairs = [[n1, n2] for n1 in self.nodes for n2 in list(self.edge_weights[n1])]
         self.node_ids = {node: i for i, node in enumerate(nodes)}
+        self._matrices = dict()
+        self._graph = None
+        self._distance_sums = None
 
-    def _adjacency_matrix(self, normalized: bool = False, weighted: bool = False) -> np.array:
+    def _adjacency_matrix(self, normalized: bool = False, weighted: bool = False) -> sparse.csr_matrix:
         """
-        Builds the adjacency matrix.
+        Builds the adjacency matrix (only once for each combination of parameters).
 
         :param normalized: indicates if the matrix should be normalized
         :param weighted: indicates if edge weights (if available) should be used instead of `1`
-        :return: adjacency matrix
+        :return: sparse adjacency matrix
         """
+        if (normalized, weighted) in self._matrices:
+            return self._matrices[(normalized, weighted)]
+
         # Build matrix
         node_size = len(self.nodes)
-        g = np.zeros((node_size, node_size), dtype='float')
+        rows, cols, values = [], [], []
         for node1, node2 in self.node_pairs:
             i, j = self.node_ids[node1], self.node_ids[node2]
             if weighted and isinstance(self.edge_weights[node1], dict):
                 # if available, use edge weight instead of '1' in matrix
-                g[j][i] = self.edge_weights[node1][node2]
+                rows.append(j)
+                cols.append(i)
+                values.append(self.edge_weights[node1][node2])
             else:
-                g[i][j] = 1
+                rows.append(i)
+                cols.append(j)
+                values.append(1)
+        g = sparse.csr_matrix((np.array(values, dtype='float'), (rows, cols)), shape=(node_size, node_size))
 
         if normalized:
             # Normalize matrix by column
-            norm = np.sum(g, axis=0)
-            g = np.divide(g, norm, where=norm != 0)  # ignores the 0 element in norm
+            norm = np.asarray(g.sum(axis=0)).ravel()
+            scale = np.divide(1, norm, out=np.zeros_like(norm), where=norm != 0)  # ignores the 0 element in norm
+            g = (g @ sparse.diags(scale)).tocsr()
 
+        self._matrices[(normalized, weighted)] = g
         return g
 
+    def _nx_graph(self) -> nx.Graph:
+        """
+        :return: NetworkX Graph of the adjacency matrix (only built once)
+        """
+        if self._graph is None:
+            from_sparse = getattr(nx, 'from_scipy_sparse_array', None) or nx.from_scipy_sparse_matrix
+            self._graph = from_sparse(self._adjacency_matrix())
+        return self._graph
+
+    def _distances(self) -> tuple:
+        """
+        Calculates the shortest path (BFS) from every node to every other node and sums the distances
+        per target node. Only a chunk of rows of the distance matrix is kept in memory at a time.
+
+        :return: (sum of inverse distances, sum of distances) numpy arrays
+        """
+        if self._distance_sums is None:
+            g = self._adjacency_matrix()
+            size = g.shape[0]
+            inverse_sum, distance_sum = np.zeros(size), np.zeros(size)
+            chunk = max(1, 2 ** 22 // max(size, 1))
+            for start in range(0, size, chunk):
+                dist = shortest_path(g, unweighted=True, indices=np.arange(start, min(start + chunk, size)))
+                distance_sum += np.sum(dist, axis=0)
+                dist[dist == 0] = np.inf
+                inverse_sum += np.sum(1 / dist, axis=0)
+            self._distance_sums = (inverse_sum, distance_sum)
+
+        return self._distance_sums
+
     def _node_weight_from_vector(self, vector: np.array) -> dict:
         """
         Maps the values of the vector to a node.
@@ -72,38 +144,62 @@ class CentralityCalculator:
         :param norm: Flag that indicates if the resulting numbers should be normed to 1
         :return: { node: value } dictionary with centrality values
         """
-        g = self._adjacency_matrix()
-        gnx = nx.from_numpy_matrix(g)
+        gnx = self._nx_graph()
         result = np.array(list(centrality_function(gnx).values()))
         if norm:
             result = norm_to_one(result)
 
         return self._node_weight_from_vector(result)
 
-    def text_rank(self) -> dict:
+    def _start_vector(self, x0: dict = None) -> np.array:
+        """
+        Creates the start vector of a power iteration.
+
+        :param x0: { node: value } dictionary of a previous solution (optional), missing nodes start with 1
+        :return: start vector
+        """
+        vector = np.ones(len(self.nodes))
+        if x0:
+            for node, index in self.node_ids.items():
+                vector[index] = x0.get(node, 1)
+        return vector
+
+    def _power_iteration(self, matrix, x0: np.array, damping=None) -> np.array:
+        return power_iteration(matrix, x0, damping, min_diff=self.min_diff, steps=self.steps, residual=self.residual)
+
+    def text_rank(self, x0: dict = None) -> dict:
         """
         Calculates the TextRank (PageRank) for the nodes.
         The value indicates the importance of a node in the network.
 
         See https://towardsdatascience.com/textrank-for-keyword-extraction-by-python-c0bae21bcec0 for reference.
 
+        :param x0: previous result of this method to start the iteration with (optional)
         :return: { node: text_rank } dictionary that maps a node to its calculated TextRank value
         """
         g = self._adjacency_matrix(normalized=True)
-        product = np.array([1] * len(self.nodes))
-
-        previous_pr = 0
-        for _ in range(self.steps):
-            product = (1 - self.damping) + self.damping * np.dot(g, product)
-            if abs(previous_pr - sum(product)) >= self.min_diff:
-                previous_pr = sum(product)
-            else:
-                break
+        product = self._power_iteration(g, self._start_vector(x0), self.damping)
 
         normed = norm_to_one(product)
         # Get weight for each node
         return self._node_weight_from_vector(normed)
 
+    def text_rank_sweep(self, dampings: list, x0: dict = None) -> dict:
+        """
+        Calculates the TextRank for several damping factors at once.
+        All damping factors are iterated together as the columns of one matrix.
+
+        :param dampings: list of damping factors
+        :param x0: previous result of `text_rank` to start the iteration with (optional)
+        :return: { damping: { node: text_rank } } dictionary
+        """
+        g = self._adjacency_matrix(normalized=True)
+        start = np.repeat(self._start_vector(x0)[:, np.newaxis], len(dampings), axis=1)
+        products = self._power_iteration(g, start, np.array(dampings))
+
+        return {damping: self._node_weight_from_vector(norm_to_one(products[:, i]))
+                for (i, damping) in enumerate(dampings)}
+
     def text_rank_nx(self) -> dict:
         """
         NetworkX implementation of the PageRank algorithm.
@@ -112,24 +208,19 @@ class CentralityCalculator:
         """
         return self._nx_centrality(nx.pagerank_numpy)
 
-    def eigenvector(self) -> dict:
+    def eigenvector(self, x0: dict = None) -> dict:
         """
         Calculates the Eigenvector for the nodes.
         The value indicates the influence of a node in the network.
         See https://en.wikipedia.org/wiki/Eigenvector_centrality
 
+        :param x0: previous result of this method to start the iteration with (optional)
         :return: { node: value } dictionary that maps a node to its calculated eigenvector value
         """
         g = self._adjacency_matrix(normalized=True)
-        product = np.array([1] * len(self.nodes))
-
-        previous_pr = 0
-        for _ in range(self.steps):
-            product = np.dot(g, product)
-            if abs(previous_pr - sum(product)) >= self.min_diff:
-                previous_pr = sum(product)
-            else:
-                break
+        # iterate with (g + I) / 2, which has the same eigenvector but doesn't oscillate on bipartite graphs
+        shifted = (g + sparse.identity(g.shape[0], format='csr')) / 2
+        product = self._power_iteration(shifted, self._start_vector(x0))
 
         normed = norm_to_one(product)
         # Get weight for each node
@@ -156,19 +247,32 @@ class CentralityCalculator:
         """
 
         size = len(self.nodes)
-        transposed = self._adjacency_matrix().T
-        b = np.array([1] * size)
-        centrality = np.linalg.solve(np.eye(size, size) - (alpha * transposed), b)
+        transposed = self._adjacency_matrix().T.tocsr()
+        b = np.ones(size)
+        # solve (I - alpha * A^T) x = b iteratively with the series x = b + alpha * A^T x
+        centrality = b
+        previous_residual = np.inf
+        for _ in range(self.steps):
+            updated = b + alpha * (transposed @ centrality)
+            residual = np.linalg.norm(updated - centrality)
+            centrality = updated
+            if residual < self.min_diff or residual >= previous_residual:
+                break
+            previous_residual = residual
+        if residual >= self.min_diff:
+            # the series doesn't converge if alpha >= 1 / largest eigenvalue, solve the system directly
+            centrality = spsolve((sparse.identity(size) - alpha * transposed).tocsc(), b)
         centrality = norm_to_one(centrality)
         return self._node_weight_from_vector(centrality)
 
-    def katz_centrality_nx(self) -> dict:
+    def katz_centrality_nx(self, alpha=0.1) -> dict:
         """
         NetworkX implementation of the Katz centrality algorithm.
 
+        :param alpha: Attenuation factor (see `katz_centrality`)
         :return: { node: value } dictionary that maps a node to its calculated katz rank value
         """
-        return self._nx_centrality(nx.katz_centrality)
+        return self._nx_centrality(partial(nx.katz_centrality, alpha=alpha))
 
     def degree(self) -> dict:
         """
@@ -177,7 +281,7 @@ class CentralityCalculator:
         :return: { node: value } dictionary that maps a node to it's calculated closeness value
         """
         g = self._adjacency_matrix()
-        g_sum = g.sum(axis=0) / (len(self.nodes) - 1)
+        g_sum = np.asarray(g.sum(axis=0)).ravel() / (len(self.nodes) - 1)
 
         return self._node_weight_from_vector(g_sum)
 
@@ -192,11 +296,8 @@ class CentralityCalculator:
         :return: { node: value } dictionary that maps a node to it's calculated harmonic degree value
         """
 
-        g = self._adjacency_matrix()
-        dist = np.array(floyd_warshall(g))
-        dist[dist == 0] = np.inf
-        norm = (1 / dist)
-        result = np.sum(norm, axis=0) / (len(g) - 1)
+        inverse_sum, _ = self._distances()
+        result = inverse_sum / (len(self.nodes) - 1)
 
         return self._node_weight_from_vector(result)
 
@@ -211,9 +312,8 @@ class CentralityCalculator:
         :return: { node: value } dictionary that maps a node to it's calculated closeness value
         """
 
-        g = self._adjacency_matrix()
-        dist = floyd_warshall(g)
-        result = (len(g) - 1) / np.sum(dist, axis=0)
+        _, distance_sum = self._distances()
+        result = (len(self.nodes) - 1) / distance_sum
 
         return self._node_weight_from_vector(result)
 
@@ -224,3 +324,55 @@ class CentralityCalculator:
         :return: { node: value } dictionary that maps a node to it's calculated betweenness value
         """
         return self._nx_centrality(nx.betweenness_centrality)
+
+    def compute_all(self, metrics: list = None, alpha=0.1, x0: dict = None) -> pd.DataFrame:
+        """
+        Calculates several centralities at once. The adjacency matrices, the NetworkX graph and the shortest
+        path distances are built only once and shared by all metrics.
+
+        The time each metric took is stored in `df.attrs['timings']`,
+        the time it took to build the shared intermediates in `df.attrs['shared_timings']`.
+
+        :param metrics: list of metric names (see CENTRALITY_METRICS), all metrics by default
+        :param alpha: Attenuation factor of the katz centralities
+        :param x0: { metric: { node: value } } previous results to start the iterative metrics with (optional)
+        :return: data frame with one row per node and one column per metric
+        """
+        metrics = list(CENTRALITY_METRICS) if metrics is None else metrics
+        unknown = [metric for metric in metrics if metric not in CENTRALITY_METRICS]
+        if unknown:
+            raise ValueError('unknown centrality metrics: {}'.format(', '.join(unknown)))
+
+        builders = {
+            'adjacency': self._adjacency_matrix,
+            'normalized': partial(self._adjacency_matrix, normalized=True),
+            'graph': self._nx_graph,
+            'distances': self._distances
+        }
+        shared_timings = dict()
+        for metric in metrics:
+            for intermediate in CENTRALITY_METRICS[metric][1]:
+                if intermediate not in shared_timings:
+                    start = time.perf_counter()
+                    builders[intermediate]()
+                    shared_timings[intermediate] = time.perf_counter() - start
+
+        columns = dict()
+        timings = dict()
+        for metric in metrics:
+            method = getattr(self, CENTRALITY_METRICS[metric][0])
+            start = time.perf_counter()
+            if metric in CENTRALITY_ALPHA_METRICS:
+                columns[metric] = method(alpha)
+            elif metric in CENTRALITY_WARM_START_METRICS and x0:
+                columns[metric] = method(x0.get(metric))
+            else:
+                columns[metric] = method()
+            timings[metric] = time.perf_counter() - start
+
+        nodes = list(self.node_ids)
+        df = pd.DataFrame({metric: [values[node] for node in nodes] for metric, values in columns.items()},
+                          index=nodes, columns=metrics)
+        df.attrs['timings'] = timings
+        df.attrs['shared_timings'] = shared_timings
+        return df
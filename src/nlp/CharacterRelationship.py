@@ -1,7 +1,7 @@
-from itertools import product
+import numpy as np
 
 from src.common.constants import CSV_CHAR_HITS
-from src.nlp.util import dist
+from src.nlp.util import window_distances, window_hits
 from src.object.Book import words_in_chapters, Book
 from src.object.Character import Character
 
@@ -11,12 +11,14 @@ class CharacterRelationship:
     Determines if two characters have a relationship in a text, chapter or book.
     """
 
-    def __init__(self, char1: Character, char2: Character, window: int = 15, threshold: int = 2):
+    def __init__(self, char1: Character, char2: Character, window: int = 15, threshold: int = 2,
+                 distances: bool = False):
         """
         :param char1: Character object
         :param char2: Character object
         :param window: lookup window of words before and after character mention
         :param threshold: amount of mentions that will count as sufficient relationship
+        :param distances: if True, a histogram of the distances of all hits is collected in `self.distances`
         """
         self.threshold = threshold
         self.window = window
@@ -27,6 +29,7 @@ class CharacterRelationship:
             self.char1.ref_name: 0,
             self.char2.ref_name: 0
         }
+        self.distances = np.zeros(window, dtype='int64') if distances else None
 
     def find_in_text(self, words: list):
         """
@@ -39,8 +42,9 @@ class CharacterRelationship:
         c2_indexes = self.char2.appearance_indices(words)
         c1_mentions = len(c1_indexes)
         c2_mentions = len(c2_indexes)
-        match_distances = [dist(item) for item in product(c1_indexes, c2_indexes) if 0 < dist(item) < self.window]
-        hits = len(match_distances)
+        hits = window_hits(c1_indexes, c2_indexes, self.window)
+        if self.distances is not None:
+            self.distances += window_distances(c1_indexes, c2_indexes, self.window)
 
         self.result[CSV_CHAR_HITS] = self.result[CSV_CHAR_HITS] + hits
         self.result[self.char1.ref_name] = self.result[self.char1.ref_name] + c1_mentions
@@ -0,0 +1,100 @@
+from src.common import constants
+from src.common.build_cache import content_hash
+
+# token attributes stored for every doc
+DOC_ATTRS = ['ORTH', 'TAG', 'POS', 'HEAD', 'DEP', 'LEMMA', 'ENT_IOB', 'ENT_TYPE']
+
+
+class DocCache:
+    """
+    Stores the spaCy Docs of books and chapters as DocBin files, so a text only has to be parsed once per pipeline.
+
+    The files are kept per model name, model version and enabled pipes in {PROJECT_DIR}/data/interim/docs.
+    Custom extension attributes (e.g. neuralcoref clusters) are not stored.
+    """
+
+    def __init__(self, nlp, cache_dir=None):
+        """
+        :param nlp: spacy nlp object, the enabled pipes are part of the cache key
+        :param cache_dir: base directory of the cache (default: {PROJECT_DIR}/data/interim/docs)
+        """
+        self.nlp = nlp
+        model = '{}_{}-{}'.format(nlp.meta.get('lang'), nlp.meta.get('name'), nlp.meta.get('version'))
+        self.directory = (cache_dir or constants.DOC_CACHE_DIR) / model / content_hash(*nlp.pipe_names)[:12]
+
+    def _file(self, book: str, chapter: int = None):
+        return self.directory / book / '{}.spacy'.format('book' if chapter is None else chapter)
+
+    def _load(self, text: str, book: str, chapter: int = None):
+        from spacy.tokens import DocBin
+
+        file = self._file(book, chapter)
+        if not file.exists():
+            return None
+        doc = next(DocBin().from_bytes(file.read_bytes()).get_docs(self.nlp.vocab))
+        # the text changed since the doc was stored
+        return doc if doc.text == text else None
+
+    def _save(self, doc, book: str, chapter: int = None):
+        from spacy.tokens import DocBin
+
+        file = self._file(book, chapter)
+        file.parent.mkdir(parents=True, exist_ok=True)
+        doc_bin = DocBin(attrs=DOC_ATTRS, store_user_data=True)
+        doc_bin.add(doc)
+        file.write_bytes(doc_bin.to_bytes())
+
+    def doc(self, text: str, book: str, chapter: int = None):
+        """
+        Loads the Doc of a text from the cache or parses and stores it.
+
+        :param text: text of the book or chapter
+        :param book: title of the book
+        :param chapter: number of the chapter, None for the whole book
+        :return: spaCy Doc
+        """
+        doc = self._load(text, book, chapter)
+        if doc is None:
+            self.nlp.max_length = max(self.nlp.max_length, len(text))
+            doc = self.nlp(text)
+            self._save(doc, book, chapter)
+        return doc
+
+    def book_doc(self, book):
+        """
+        :param book: Book object
+        :return: spaCy Doc of the whole book
+        """
+        return self.doc(book.content(), book.title)
+
+    def chapter_doc(self, book, i: int):
+        """
+        :param book: Book object
+        :param i: index of the chapter (see Book.chapter)
+        :return: spaCy Doc of the chapter
+        """
+        chapter = book.chapter(i)
+        return self.doc(chapter.content(), book.title, chapter.number)
+
+    def chapter_docs(self, book, batch_size: int = 8, n_process: int = 1):
+        """
+        Yields the Docs of all chapters of a book. Chapters that aren't cached are parsed with `nlp.pipe`.
+
+        :param book: Book object
+        :param batch_size: number of chapters per spaCy batch
+        :param n_process: number of processes spaCy uses
+        :return: generator of spaCy Docs in chapter order
+        """
+        texts = [chapter.content() for chapter in book.chapters]
+        missing = [i for i, chapter in enumerate(book.chapters) if not self._file(book.title, chapter.number).exists()]
+        if missing:
+            self.nlp.max_length = max([self.nlp.max_length] + [len(texts[i]) for i in missing])
+        parsed = self.nlp.pipe((texts[i] for i in missing), batch_size=batch_size, n_process=n_process)
+        missing = set(missing)
+        for i, chapter in enumerate(book.chapters):
+            if i in missing:
+                doc = next(parsed)
+                self._save(doc, book.title, chapter.number)
+            else:
+                doc = self.doc(texts[i], book.title, chapter.number)
+            yield doc
@@ -0,0 +1,105 @@
+import numpy as np
+
+from src.common.constants import CSV_CHAR_HITS
+from src.nlp.util import window_hits
+from src.object.AliasMatcher import AliasMatcher
+from src.object.Book import Book
+
+
+class RelationshipMatrix:
+    """
+    Determines the relationships of all given characters with each other in a text, chapter or book.
+
+    Unlike CharacterRelationship, which scans the text once per character pair, every segment is tokenized once
+    and the mentions of all characters are tagged in a single sweep by an AliasMatcher.
+    The results are identical to running CharacterRelationship for every pair.
+    """
+
+    def __init__(self, characters: list, window: int = 15, threshold: int = 2):
+        """
+        :param characters: list of Character objects
+        :param window: lookup window of words before and after character mention
+        :param threshold: amount of mentions that will count as sufficient relationship
+        """
+        self.threshold = threshold
+        self.window = window
+        self.characters = list(characters)
+        self.char_ids = {char.ref_name: i for i, char in enumerate(self.characters)}
+        self.hits = np.zeros((len(self.characters), len(self.characters)), dtype='int64')
+        self.mentions = np.zeros(len(self.characters), dtype='int64')
+        self._matcher = AliasMatcher(self.characters)
+
+    def find_in_text(self, words: list):
+        """
+        Calculates the relationships of all characters by looking for
+        mentions of each character pair within the given window in the given bag of words.
+
+        :param words: bag of words
+        """
+        matches = self._matcher.find(words)
+        indices = [matches[char.ref_name] for char in self.characters]
+        found = [i for i, idx in enumerate(indices) if idx]
+        for i in found:
+            self.mentions[i] += len(indices[i])
+        for pos, i in enumerate(found):
+            for j in found[pos + 1:]:
+                hits = window_hits(indices[i], indices[j], self.window)
+                self.hits[i][j] += hits
+                self.hits[j][i] += hits
+
+    def find_in_chapters(self, chapters: list):
+        """
+        Calculates the relationships of all characters by looking for
+        mentions of each character pair within the given window for each given chapter.
+
+        :param chapters: List of Chapter objects
+        """
+        for chapter in chapters:
+            for segment in chapter.segments:
+                self.find_in_text(segment.words())
+
+    def find_in_book(self, book: Book):
+        """
+        Calculates the relationships of all characters by looking for
+        mentions of each character pair within the given window for each chapter in the book.
+
+        :param book: Book object
+        """
+        self.find_in_chapters(book.chapters)
+
+    def result(self, char1, char2) -> dict:
+        """
+        Returns the result of one character pair in the same form as CharacterRelationship.result.
+
+        :param char1: Character object
+        :param char2: Character object
+        :return: { 'hits': hits, char1: mentions, char2: mentions } dictionary
+        """
+        i, j = self.char_ids[char1.ref_name], self.char_ids[char2.ref_name]
+        return {
+            CSV_CHAR_HITS: int(self.hits[i][j]),
+            char1.ref_name: int(self.mentions[i]),
+            char2.ref_name: int(self.mentions[j])
+        }
+
+    def have_relationship(self, char1, char2) -> bool:
+        """
+        Determines if the character tuple has a relationship by testing if the number of hits is above
+        the specified threshold.
+
+        :param char1: Character object
+        :param char2: Character object
+        :return: True if hits between char1 and char2 are greater than the threshold, False otherwise.
+        """
+        return self.hits[self.char_ids[char1.ref_name]][self.char_ids[char2.ref_name]] > self.threshold
+
+    def relationships(self):
+        """
+        Yields every character pair that has a relationship, in the order the characters were given.
+
+        :return: generator of (char1, char2, result) tuples
+        """
+        for i, char1 in enumerate(self.characters):
+            for char2 in self.characters[i + 1:]:
+                if self.have_relationship(char1, char2):
+                    yield char1, char2, self.result(char1, char2)
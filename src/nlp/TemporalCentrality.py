@@ -0,0 +1,125 @@
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from src.common import constants
+from src.nlp.CentralityCalculator import CentralityCalculator, CENTRALITY_WARM_START_METRICS
+from src.nlp.RelationshipMatrix import RelationshipMatrix
+
+# centralities of the time series, the NetworkX variants are left out because they are slow on many windows
+TEMPORAL_METRICS = [constants.CENT_CSV_OTR, constants.CENT_CSV_OEV, constants.CENT_CSV_OKATZ, constants.CENT_CSV_DEG,
+                    constants.CENT_CSV_HARM, constants.CENT_CSV_CLSNS, constants.CENT_CSV_BTWN]
+
+
+class TemporalCentrality:
+    """
+    Calculates the centralities of the characters over time, with one relationship graph per window of chapters.
+
+    Every chapter is scanned only once. Its hits and mentions are added to the window when it enters the window
+    and subtracted when it leaves it. TextRank and eigenvector of a window start with the results of the
+    previous window.
+    """
+
+    def __init__(self, characters: list, chapters: int = 1, window: int = 15, threshold: int = 2,
+                 metrics: list = None, alpha=0.1):
+        """
+        :param characters: list of Character objects
+        :param chapters: number of consecutive chapters in a window
+        :param window: lookup window of words before and after character mention
+        :param threshold: amount of mentions that will count as sufficient relationship
+        :param metrics: list of centrality names (see CENTRALITY_METRICS), TEMPORAL_METRICS by default
+        :param alpha: attenuation factor of the katz centralities
+        """
+        self.chapters = chapters
+        self.threshold = threshold
+        self.metrics = metrics or TEMPORAL_METRICS
+        self.alpha = alpha
+        self._matrix = RelationshipMatrix(characters, window, threshold)
+        self.characters = self._matrix.characters
+        self.hits = np.zeros_like(self._matrix.hits)
+        self.mentions = np.zeros_like(self._matrix.mentions)
+        self._window = deque()
+        self._previous = None
+
+    def _chapter_counts(self, chapter) -> tuple:
+        """
+        Counts the hits and mentions of all characters in one chapter.
+
+        :param chapter: Chapter object
+        :return: (rows, columns, hits, characters, mentions) numpy arrays of all non-zero counts
+        """
+        self._matrix.hits[:] = 0
+        self._matrix.mentions[:] = 0
+        self._matrix.find_in_chapters([chapter])
+        rows, cols = np.nonzero(self._matrix.hits)
+        chars = np.nonzero(self._matrix.mentions)[0]
+        return rows, cols, self._matrix.hits[rows, cols], chars, self._matrix.mentions[chars]
+
+    def _update(self, counts: tuple, sign: int):
+        rows, cols, hits, chars, mentions = counts
+        self.hits[rows, cols] += sign * hits
+        self.mentions[chars] += sign * mentions
+
+    def slide(self, chapter):
+        """
+        Moves the window one chapter ahead.
+
+        :param chapter: Chapter object that enters the window
+        """
+        counts = self._chapter_counts(chapter)
+        self._update(counts, 1)
+        self._window.append(counts)
+        if len(self._window) > self.chapters:
+            self._update(self._window.popleft(), -1)
+
+    def window_centralities(self) -> pd.DataFrame:
+        """
+        Calculates the centralities of all characters that are mentioned in the current window.
+
+        :return: data frame with one row per character and the mentions and centralities as columns,
+                 None if less than two characters are mentioned
+        """
+        present = np.nonzero(self.mentions)[0]
+        if len(present) < 2:
+            return None
+
+        names = [self.characters[i].ref_name for i in present]
+        hits = self.hits[np.ix_(present, present)]
+        edges = {name: {names[j]: int(hits[i][j]) for j in np.nonzero(hits[i] > self.threshold)[0]}
+                 for (i, name) in enumerate(names)}
+        df = CentralityCalculator(names, edges).compute_all(self.metrics, self.alpha, self._previous)
+        self._previous = {metric: df[metric].to_dict() for metric in self.metrics
+                          if metric in CENTRALITY_WARM_START_METRICS}
+        df.insert(0, constants.CSV_CHAR_MENT, self.mentions[present])
+
+        return df
+
+    def series(self, books: list):
+        """
+        Slides the window over all chapters of the given books (in the given order).
+
+        :param books: list of Book objects
+        :return: generator of long format data frames, one per chapter,
+                 with the book, chapter (last chapter of the window) and character as keys
+        """
+        for book in books:
+            for chapter in book.chapters:
+                self.slide(chapter)
+                df = self.window_centralities()
+                if df is not None:
+                    df.insert(0, constants.CSV_CHAR_CHAR, df.index)
+                    df.insert(0, constants.CSV_CHAR_CHAPTER, chapter.number)
+                    df.insert(0, constants.CSV_CHAR_BOOK, book.title)
+                    yield df.reset_index(drop=True)
+
+    def calculate(self, books: list) -> pd.DataFrame:
+        """
+        :param books: list of Book objects
+        :return: long format data frame of all windows (see `series`)
+        """
+        dfs = list(self.series(books))
+        if not dfs:
+            return pd.DataFrame(columns=[constants.CSV_CHAR_BOOK, constants.CSV_CHAR_CHAPTER, constants.CSV_CHAR_CHAR,
+                                         constants.CSV_CHAR_MENT] + self.metrics)
+        return pd.concat(dfs, ignore_index=True)
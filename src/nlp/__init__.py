@@ -1,3 +1,11 @@
 from .CentralityCalculator import *
 from .CharacterRelationship import *
+from .DocCache import *
+from .RelationshipMatrix import *
+from .TemporalCentrality import *
 from .util import *
+
+
+def __getattr__(name):
+    # attributes of util that are loaded on first use (e.g. STOPWORDS)
+    return getattr(util, name)
@@ -1,6 +1,4 @@
-import neuralcoref
 import numpy as np
-import spacy
 
 from src.common.constants import REFERENCES_DIR
 
@@ -19,6 +17,49 @@ def norm_to_one(array: np.array) -> np.array:
     return array
 
 
+def power_iteration(matrix, x0: np.array, damping=None, min_diff: float = 1e-8, steps: int = 1000,
+                    residual: str = 'l1') -> np.array:
+    """
+    Power iteration that stops as soon as the residual between two steps is smaller than `min_diff`.
+
+    With a damping factor d every step calculates `x = (1 - d) + d * (matrix @ x)` (PageRank),
+    without one `x = matrix @ x` normalized to an L1 norm of 1.
+
+    Several vectors can be iterated at once by passing a matrix with one vector per column as `x0`,
+    together with one damping factor per column.
+
+    :param matrix: (sparse) square matrix
+    :param x0: start vector (or matrix of start vectors)
+    :param damping: damping factor (or numpy array of damping factors, one per column of x0)
+    :param min_diff: convergence threshold
+    :param steps: maximum number of iteration steps
+    :param residual: norm of the residual, either 'l1' (sum of differences) or 'max' (largest difference)
+    :return: vector (or matrix of vectors) after convergence
+    """
+    if residual not in ('l1', 'max'):
+        raise ValueError('unknown residual norm: {}'.format(residual))
+    x = np.array(x0, dtype='float64')
+    difference = np.empty_like(x)
+    if damping is not None:
+        damping = np.asarray(damping, dtype='float64')
+    for _ in range(steps):
+        product = matrix @ x
+        if damping is None:
+            total = np.abs(product).sum(axis=0)
+            np.divide(product, total, out=product, where=total != 0)
+        else:
+            product *= damping
+            product += 1 - damping
+        np.subtract(product, x, out=difference)
+        np.abs(difference, out=difference)
+        x = product
+        delta = difference.sum(axis=0) if residual == 'l1' else difference.max(axis=0)
+        if np.all(delta < min_diff):
+            break
+
+    return x
+
+
 def multiply_and_round(num: float, factor: float = 100, precision: int = 2) -> float:
     """
     Takes a floating point value (presumably one between 0 and 1), multiplies it with a given factor (default 100)
@@ -42,6 +83,64 @@ def dist(item: "tuple of int") -> int:
     return abs(item[0] - item[1])
 
 
+def _window_bounds(indices1: np.array, indices2: np.array, window: int) -> tuple:
+    """
+    Finds the range of indices2 that lies within the window around each element of indices1.
+
+    :param indices1: sorted numpy array of ints
+    :param indices2: sorted numpy array of ints
+    :param window: size of the window
+    :return: (lower, upper) numpy arrays of positions in indices2
+    """
+    lower = np.searchsorted(indices2, indices1 - window, side='right')
+    upper = np.searchsorted(indices2, indices1 + window, side='left')
+    return lower, upper
+
+
+def window_hits(indices1: list, indices2: list, window: int) -> int:
+    """
+    Counts all pairs of two sorted index lists whose distance is greater than 0 and smaller than the window.
+
+    Equivalent to counting `0 < dist(item) < window` over the product of both lists, in O(n log m).
+
+    :param indices1: sorted list of ints
+    :param indices2: sorted list of ints
+    :param window: size of the window
+    :return: number of pairs within the window
+    """
+    if len(indices1) == 0 or len(indices2) == 0:
+        return 0
+    indices1, indices2 = np.asarray(indices1), np.asarray(indices2)
+    lower, upper = _window_bounds(indices1, indices2, window)
+    # pairs with distance 0 are no hits
+    same = np.searchsorted(indices2, indices1)
+    same = np.count_nonzero(indices2[np.minimum(same, len(indices2) - 1)] == indices1)
+    return int(np.sum(upper - lower)) - same
+
+
+def window_distances(indices1: list, indices2: list, window: int) -> np.array:
+    """
+    Creates a histogram of the distances of all pairs of two sorted index lists that lie within the window.
+
+    :param indices1: sorted list of ints
+    :param indices2: sorted list of ints
+    :param window: size of the window
+    :return: numpy array of length `window` that holds the number of pairs for each distance
+    """
+    if len(indices1) == 0 or len(indices2) == 0:
+        return np.zeros(window, dtype='int64')
+    indices1, indices2 = np.asarray(indices1), np.asarray(indices2)
+    lower, upper = _window_bounds(indices1, indices2, window)
+    counts = upper - lower
+    # position of every pair in indices2, without looping over indices1
+    offsets = np.arange(np.sum(counts)) - np.repeat(np.cumsum(counts) - counts, counts)
+    distances = np.abs(indices2[np.repeat(lower, counts) + offsets] - np.repeat(indices1, counts))
+    histogram = np.bincount(distances, minlength=window)
+    histogram[0] = 0
+
+    return histogram
+
+
 def stopwords():
     """
     Loads all stopwords from the stopwords file into a set.
@@ -50,10 +149,30 @@ def stopwords():
     return words.union([w.replace("'", '’') for w in words])
 
 
-STOPWORDS = stopwords()
+_STOPWORDS = None
+
+
+def cached_stopwords() -> set:
+    """
+    :return: set of all stopwords, the stopwords file is only read once
+    """
+    global _STOPWORDS
+    if _STOPWORDS is None:
+        _STOPWORDS = stopwords()
+    return _STOPWORDS
+
+
+def __getattr__(name):
+    # STOPWORDS is only read from its file when it is used
+    if name == 'STOPWORDS':
+        return cached_stopwords()
+    raise AttributeError("module '{}' has no attribute '{}'".format(__name__, name))
 
 
 def load_spacy(model, **overrides):
+    import neuralcoref
+    import spacy
+
     nlp = spacy.load(model, **overrides)
     neuralcoref.add_to_pipe(nlp)
     add_stopwords(nlp)
@@ -61,4 +180,4 @@ def load_spacy(model, **overrides):
 
 
 def add_stopwords(nlp):
-    nlp.Defaults.stop_words |= STOPWORDS
+    nlp.Defaults.stop_words |= cached_stopwords()
@@ -0,0 +1,94 @@
+class _Node:
+    """
+    Node of the alias trie.
+    """
+    __slots__ = ['refs', 'next']
+
+    def __init__(self):
+        self.refs = set()  # reference names of characters with an alias that ends in this node
+        self.next = dict()  # following word -> _Node
+
+
+class AliasMatcher:
+    """
+    Finds the aliases of several characters in a bag of words in one pass.
+
+    The aliases are compiled into a word trie. Like Character.appearance_indices, a character is matched
+    by a single word or by a word together with its successor, so the trie has a depth of two.
+    """
+
+    def __init__(self, characters: list):
+        """
+        :param characters: list of Character objects
+        """
+        self.ref_names = [char.ref_name for char in characters]
+        self._root = dict()
+        for char in characters:
+            for name in char.alt_names:
+                self._node(name).refs.add(char.ref_name)
+                # an alias may span a word pair at every whitespace in it
+                for (i, c) in enumerate(name):
+                    if c == ' ':
+                        node = self._node(name[:i])
+                        node.next.setdefault(name[i + 1:], _Node()).refs.add(char.ref_name)
+
+    def _node(self, word: str) -> _Node:
+        return self._root.setdefault(word, _Node())
+
+    def _matches(self, words: list):
+        """
+        Yields every position in the bag of words where an alias starts.
+
+        :param words: bag of words
+        :return: generator of (index, single word matches, word pair matches) tuples
+        """
+        last = len(words) - 1
+        for (index, word) in enumerate(words):
+            node = self._root.get(word)
+            if node is None:
+                continue
+            if index < last:
+                pair = node.next.get(words[index + 1])
+                pair = pair.refs if pair else ()
+            else:
+                # the word pair of the last word is the word itself
+                pair = node.refs
+            if node.refs or pair:
+                yield index, node.refs, pair
+
+    def find(self, words: list) -> dict:
+        """
+        Lists all indices that mark the appearance of each character in the given bag of words.
+
+        :param words: bag of words to look up the character names in.
+        :return: { ref_name: [indices] } dictionary for every character of this matcher
+        """
+        indices = {ref_name: [] for ref_name in self.ref_names}
+        next_index = dict()
+        for (index, single, pair) in self._matches(words):
+            for ref_name in single | set(pair):
+                if index < next_index.get(ref_name, 0):
+                    continue
+                idx = index + 2 if ref_name in pair else index + 1
+                indices[ref_name].append(idx)
+                next_index[ref_name] = idx + 1
+
+        return indices
+
+    def appearing(self, words: list) -> set:
+        """
+        :param words: bag of words to look up the character names in.
+        :return: set of reference names of all characters that appear in the given bag of words
+        """
+        found = set()
+        for (_, single, pair) in self._matches(words):
+            found.update(single, pair)
+
+        return found
+
+    def appears_in(self, words: list) -> bool:
+        """
+        :param words: bag of words to look up the character names in.
+        :return: True if any character of this matcher appears in the given bag of words, False otherwise
+        """
+        return next(self._matches(words), None) is not None
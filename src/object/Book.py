@@ -1,9 +1,10 @@
-from functools import reduce
+from itertools import chain
 
 from colorama import Fore, Style
 
 from src.object.Chapter import Chapter
 from src.object.ChapterType import ChapterType
+from src.object.Segment import join_content
 
 
 def words_in_chapters(chapters: list) -> list:
@@ -13,7 +14,7 @@ def words_in_chapters(chapters: list) -> list:
     :param chapters: Chapter objects
     :return: all words in the given Chapters as a list of words
     """
-    return reduce(lambda c1, c2: c1 + c2, map(lambda c: c.words(), chapters))
+    return list(chain.from_iterable(c.iter_words() for c in chapters))
 
 
 def content_in_chapters(chapters: list) -> str:
@@ -23,7 +24,7 @@ def content_in_chapters(chapters: list) -> str:
     :param chapters: Chapter objects
     :return: complete content of the given chapters (without Chapter header).
     """
-    return reduce(lambda c1, c2: c1 + c2, map(lambda c: c.content(), chapters))
+    return ''.join(c.content() for c in chapters)
 
 
 class Book:
@@ -42,6 +43,15 @@ class Book:
         self.chapters = list(chapters)
         self._characters = list()
 
+    @property
+    def chapters(self) -> list:
+        return self._chapters
+
+    @chapters.setter
+    def chapters(self, chapters: list):
+        self._chapters = chapters
+        self._content = None
+
     def is_novel(self) -> bool:
         """
         :return: 'True' if the Book more than one Chapter, 'False' otherwise
@@ -123,7 +133,19 @@ class Book:
 
         :return: Number of Words in the book
         """
-        return len(self.words())
+        return sum(c.count_words() for c in self.chapters)
+
+    def iter_lines(self):
+        """
+        :return: iterator over all lines in the Book
+        """
+        return chain.from_iterable(c.iter_lines() for c in self.chapters)
+
+    def iter_words(self):
+        """
+        :return: iterator over all words in the Book (see `words()`)
+        """
+        return chain.from_iterable(c.iter_words() for c in self.chapters)
 
     def words(self) -> list:
         """
@@ -133,13 +155,27 @@ class Book:
         """
         return words_in_chapters(self.chapters)
 
+    def tokenize(self):
+        """
+        Tokenizes every Segment once and keeps the words as a TokenStream,
+        so that later calls of `words()` and `count_words()` don't parse the text again.
+
+        :return: the TokenStream of this Book
+        """
+        from src.object.TokenStream import TokenStream
+
+        stream = TokenStream.from_book(self)
+        stream.attach(self)
+        return stream
+
     def content(self) -> str:
         """
         Returns the text of each Chapter as a single string.
 
         :return: complete Book content (without Chapter header).
         """
-        return reduce(lambda c1, c2: c1 + c2, map(lambda c: c.content(), self.chapters))
+        self._content = join_content([c.content() for c in self.chapters], self._content)
+        return self._content[1]
 
     def print_simple(self):
         """
@@ -190,20 +226,25 @@ class Book:
         return print_str
 
 
-def book_to_dict(book) -> dict:
+def book_to_dict(book, with_tokens: bool = False) -> dict:
     """
     Saves a Book object as a dict for serialisation via JSON.
 
     :param book: Book object
+    :param with_tokens: also save the words of the book as TokenStream
     :return: Serialized Book object as dict
     """
     from src.object.Chapter import chapter_to_dict
+    from src.object.TokenStream import TokenStream, token_stream_to_dict
 
-    return {
+    obj = {
         'title': book.title,
         'number': book.number,
         'chapters': [chapter_to_dict(c) for c in book.chapters]
     }
+    if with_tokens:
+        obj['tokens'] = token_stream_to_dict(TokenStream.from_book(book))
+    return obj
 
 
 def book_from_dict(obj) -> Book:
@@ -214,7 +255,11 @@ def book_from_dict(obj) -> Book:
     :return: Deserialized Book object
     """
     from src.object.Chapter import chapter_from_dict
+    from src.object.TokenStream import token_stream_from_dict
 
     if 'title' in obj and 'number' in obj and 'chapters' in obj:
-        return Book(obj['title'], obj['number'], [chapter_from_dict(c) for c in obj['chapters']])
+        book = Book(obj['title'], obj['number'], [chapter_from_dict(c) for c in obj['chapters']])
+        if 'tokens' in obj:
+            token_stream_from_dict(obj['tokens']).attach(book)
+        return book
     return obj
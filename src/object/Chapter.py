@@ -1,8 +1,8 @@
-from functools import reduce
+from itertools import chain
 
 from src.object.ChapterType import ChapterType
 from src.object.Character import Character
-from src.object.Segment import Segment
+from src.object.Segment import Segment, join_content
 
 
 class Chapter:
@@ -21,6 +21,15 @@ class Chapter:
         self.segments = segments
         self.chapter_type = c_type
 
+    @property
+    def segments(self) -> list:
+        return self._segments
+
+    @segments.setter
+    def segments(self, segments: list):
+        self._segments = segments
+        self._content = None
+
     def title(self) -> str:
         """
         Creates a formatted string that represents the chapter title.
@@ -46,7 +55,7 @@ class Chapter:
 
         :return: Number of Words in the Chapter
         """
-        return len(self.words())
+        return sum(s.count_words() for s in self.segments)
 
     def content(self) -> str:
         """
@@ -54,7 +63,20 @@ class Chapter:
 
         :return: complete Chapter content (without Chapter header).
         """
-        return reduce(lambda s1, s2: s1 + s2, map(lambda s: s.content(), self.segments))
+        self._content = join_content([s.content() for s in self.segments], self._content)
+        return self._content[1]
+
+    def iter_lines(self):
+        """
+        :return: iterator over all lines in the Chapter
+        """
+        return chain.from_iterable(s.iter_lines() for s in self.segments)
+
+    def iter_words(self):
+        """
+        :return: iterator over all words in the Chapter (see `words()`)
+        """
+        return chain.from_iterable(s.iter_words() for s in self.segments)
 
     def words(self) -> list:
         """
@@ -62,7 +84,7 @@ class Chapter:
 
         :return: all words in the Chapter as a list of words
         """
-        return reduce(lambda s1, s2: s1 + s2, map(lambda s: s.words(), self.segments))
+        return list(self.iter_words())
 
     def __repr__(self):
         return '{}, Segments: {}, Words: {}'.format(self.title(), len(self.segments), self.count_words())
@@ -9,7 +9,26 @@ class Character:
         :param alt_names: list of alternative names and aliases for the Character
         """
         self.ref_name = ref_name
-        self.alt_names = [name for name in alt_names]
+        self.alt_names = alt_names
+
+    @property
+    def alt_names(self) -> list:
+        return self._alt_names
+
+    @alt_names.setter
+    def alt_names(self, alt_names: list):
+        self._alt_names = [name for name in alt_names]
+        self._matcher = None
+
+    def _alias_matcher(self):
+        """
+        :return: AliasMatcher for the aliases of this Character (compiled on first use)
+        """
+        if self._matcher is None:
+            from src.object.AliasMatcher import AliasMatcher
+
+            self._matcher = AliasMatcher([self])
+        return self._matcher
 
     def appearance_indices(self, words: list) -> list:
         """
@@ -17,20 +36,7 @@ class Character:
         :param words: bag of words to look up the character name in.
         :return: list of indices that mark the appearance of the characters name
         """
-        indices = []
-        index = 0
-        while len(words) > index:
-            idx = index
-            bigram = ' '.join(words[index:index + 1])
-            trigram = ' '.join(words[index:index + 2])
-            if words[idx] in self.alt_names or bigram in self.alt_names or trigram in self.alt_names:
-                if bigram in self.alt_names:
-                    idx = index + 1
-                if trigram in self.alt_names:
-                    idx = index + 2
-                indices.append(idx)
-            index = idx + 1
-        return indices
+        return self._alias_matcher().find(words)[self.ref_name]
 
     def appears_in(self, words: list) -> bool:
         """
@@ -38,16 +44,7 @@ class Character:
         :param words: bag of words to look up the character name in.
         :return: list of indices that mark the appearance of the characters name
         """
-        index = 0
-        while len(words) > index:
-            idx = index
-            bigram = ' '.join(words[index:index + 1])
-            trigram = ' '.join(words[index:index + 2])
-            if words[idx] in self.alt_names or bigram in self.alt_names or trigram in self.alt_names:
-                return True
-            index = idx + 1
-
-        return False
+        return self._alias_matcher().appears_in(words)
 
     def __repr__(self):
         return self.ref_name
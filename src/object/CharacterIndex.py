@@ -0,0 +1,42 @@
+import unicodedata
+
+
+def fold_name(name: str) -> str:
+    """
+    Normalizes a name for case and diacritic insensitive comparison (e.g. 'Cortázar' -> 'cortazar').
+
+    :param name: name
+    :return: folded name
+    """
+    decomposed = unicodedata.normalize('NFKD', name)
+    return ''.join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+
+
+class CharacterIndex:
+    """
+    Maps every alias of several characters to its Character object.
+
+    If several characters share an alias, the first character in the given list is used.
+    Names are looked up as they are first and with case and diacritics folded second.
+    """
+
+    def __init__(self, characters: list):
+        """
+        :param characters: list of Character objects
+        """
+        self._exact = dict()
+        self._folded = dict()
+        for char in characters:
+            for name in char.alt_names:
+                self._exact.setdefault(name, char)
+                self._folded.setdefault(fold_name(name), char)
+
+    def find(self, name: str):
+        """
+        :param name: any alias of a character
+        :return: Character object with the given alias, None if there is none
+        """
+        char = self._exact.get(name)
+        if char is None:
+            char = self._folded.get(fold_name(name))
+        return char
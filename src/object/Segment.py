@@ -1,5 +1,21 @@
 import re
-from functools import reduce
+
+WORD_PATTERN = re.compile(r'(?!-)(?:-\b|\b-|\'\b|\b\'|\w)+(?=\b)')
+
+
+def join_content(parts: list, cached: tuple = None) -> tuple:
+    """
+    Joins the content of several Segments or Chapters into a single string.
+
+    The previously joined string is reused as long as all parts are still the same string objects.
+
+    :param parts: content strings
+    :param cached: (parts, content) tuple returned by the previous call or None
+    :return: (parts, content) tuple
+    """
+    if cached is not None and len(cached[0]) == len(parts) and all(p1 is p2 for p1, p2 in zip(cached[0], parts)):
+        return cached
+    return parts, ''.join(parts)
 
 
 class Segment:
@@ -18,13 +34,27 @@ class Segment:
         self.number = number
         self.lines = lines
 
+    @property
+    def lines(self) -> list:
+        return self._lines
+
+    @lines.setter
+    def lines(self, lines: list):
+        self._lines = lines
+        # TokenView of a TokenStream the words are read from (see TokenStream.attach)
+        self.tokens = None
+        self._content = None
+        self._words = None
+
     def count_words(self) -> int:
         """
         Counts all words in the Segment.
 
         :return: Number of Words in the Chapter
         """
-        return len(self.words())
+        if self.tokens is not None:
+            return len(self.tokens)
+        return len(self._word_list())
 
     def content(self) -> str:
         """
@@ -32,7 +62,29 @@ class Segment:
 
         :return: complete Segment content.
         """
-        return reduce(lambda l1, l2: l1 + l2, self.lines) if len(self.lines) > 0 else ''
+        if self._content is None:
+            self._content = ''.join(self.lines)
+        return self._content
+
+    def iter_lines(self):
+        """
+        :return: iterator over all lines in the Segment
+        """
+        return iter(self.lines)
+
+    def _word_list(self) -> list:
+        if self.tokens is not None:
+            return self.tokens.words()
+        if self._words is None:
+            text = self.content().replace('’', '\'')
+            self._words = WORD_PATTERN.findall(text)
+        return self._words
+
+    def iter_words(self):
+        """
+        :return: iterator over all words in the Segment (see `words()`)
+        """
+        return iter(self._word_list())
 
     def words(self) -> list:
         """
@@ -40,14 +92,42 @@ class Segment:
 
         :return: all words in the Segment as a list of words
         """
-        pattern = re.compile(r'(?!-)(?:-\b|\b-|\'\b|\b\'|\w)+(?=\b)')
-        text = self.content().replace('’', '\'')
-        return re.findall(pattern, text)
+        return list(self._word_list())
 
     def __repr__(self):
         return 'No: {}, Lines: {}, Words: {}'.format(self.number, len(self.lines), self.count_words())
 
 
+class LazySegment(Segment):
+    """
+    Represents a Segment whose lines are only read on first access (see book_io.load_binary_lazy)
+    """
+
+    def __init__(self, number: int, source, start: int, end: int, characters=None):
+        """
+        :param number: ordinal number in the chapter
+        :param source: object with a `lines(start, end)` method that reads the lines of the book
+        :param start: index of the first line of the segment in the book
+        :param end: index after the last line of the segment in the book
+        """
+        self._source = source
+        self._start = start
+        self._end = end
+        super().__init__(number, None, characters)
+
+    @property
+    def lines(self) -> list:
+        if self._lines is None and self._source is not None:
+            self._lines = self._source.lines(self._start, self._end)
+        return self._lines
+
+    @lines.setter
+    def lines(self, lines: list):
+        Segment.lines.fset(self, lines)
+        if lines is not None:
+            self._source = None
+
+
 def segment_to_dict(segment: Segment) -> dict:
     """
     Saves a Segment object as a dict for serialisation via JSON.
@@ -0,0 +1,101 @@
+class TokenView:
+    """
+    Represents the words of one Segment as a slice of a TokenStream
+    """
+
+    def __init__(self, stream, start: int, end: int):
+        """
+        :param stream: TokenStream the words are stored in
+        :param start: offset of the first word in the stream
+        :param end: offset after the last word in the stream
+        """
+        self.stream = stream
+        self.start = start
+        self.end = end
+
+    def words(self) -> list:
+        """
+        :return: all words of this view as a list of words
+        """
+        vocabulary = self.stream.vocabulary
+        return [vocabulary[i] for i in self.stream.ids[self.start:self.end]]
+
+    def __len__(self):
+        return self.end - self.start
+
+
+class TokenStream:
+    """
+    Represents all words of a Book as a list of token ids with a shared vocabulary
+    """
+
+    def __init__(self, vocabulary: list, ids: list, offsets: list):
+        """
+        :param vocabulary: list of all distinct words, the position of a word is its token id
+        :param ids: token ids of all words in the book
+        :param offsets: offset of the first word of each segment in `ids` (in book order),
+                        followed by the total number of words
+        """
+        self.vocabulary = vocabulary
+        self.ids = ids
+        self.offsets = offsets
+
+    @staticmethod
+    def from_book(book):
+        """
+        Tokenizes every Segment of the given Book once.
+
+        :param book: Book object
+        :return: TokenStream of the book
+        """
+        token_ids = dict()
+        ids = []
+        offsets = [0]
+        for chapter in book.chapters:
+            for segment in chapter.segments:
+                ids.extend(token_ids.setdefault(word, len(token_ids)) for word in segment.words())
+                offsets.append(len(ids))
+
+        return TokenStream(list(token_ids), ids, offsets)
+
+    def attach(self, book):
+        """
+        Lets every Segment of the given Book read its words from this stream.
+
+        :param book: Book object this stream was created from
+        """
+        segments = [segment for chapter in book.chapters for segment in chapter.segments]
+        if len(segments) != len(self.offsets) - 1:
+            raise ValueError('token stream has {} segments, book "{}" has {}'.format(
+                len(self.offsets) - 1, book.title, len(segments)))
+        for (i, segment) in enumerate(segments):
+            segment.tokens = TokenView(self, self.offsets[i], self.offsets[i + 1])
+
+    def __len__(self):
+        return len(self.ids)
+
+
+def token_stream_to_dict(stream: TokenStream) -> dict:
+    """
+    Saves a TokenStream object as a dict for serialisation via JSON.
+
+    :param stream: TokenStream object
+    :return: Serialized TokenStream object as dict
+    """
+    return {
+        'vocabulary': stream.vocabulary,
+        'ids': stream.ids,
+        'offsets': stream.offsets
+    }
+
+
+def token_stream_from_dict(obj) -> TokenStream:
+    """
+    Loads a serialized JSON dict as a TokenStream object.
+
+    :param obj: JSON dict
+    :return: Deserialized TokenStream object
+    """
+    if 'vocabulary' in obj and 'ids' in obj and 'offsets' in obj:
+        return TokenStream(obj['vocabulary'], obj['ids'], obj['offsets'])
+    return obj
@@ -3,3 +3,4 @@ from .Chapter import *
 from .ChapterType import *
 from .Segment import *
 from .Speech import *
+from .TokenStream import *
@@ -3,7 +3,8 @@ from spacy import displacy
 from textblob import TextBlob
 from textblob.sentiments import NaiveBayesAnalyzer
 
-from src import parse_speech_in_segment
+from src import parse_speech_in_book, parse_speech_in_segment
+from src.nlp import DocCache
 from src.nlp.util import load_spacy
 from src.common.constants import MODEL_DIR, MODEL_DATA_DIR
 from src.common import load_book_by_nr, load_book
@@ -33,7 +34,7 @@ def dep():
     book = load_book_by_nr(1)
 
     nlp = load_spacy('en')
-    doc = nlp(book.chapter(2).content())
+    doc = DocCache(nlp).chapter_doc(book, 2)
     displacy.serve(doc, style='dep')
 
 
@@ -50,10 +51,11 @@ def text_blob():
 def speech():
     nlp = load_spacy('en', disable=['tokenizer', 'textcat', 'ner'])
     book = load_book_by_nr(1)
+    book_speeches = parse_speech_in_book(nlp, book)
     for chapter in book.chapters:
         speech_content = ''
         for segment in chapter.segments:
-            analyse_lines_of_undefined_speakers(nlp, segment)
+            analyse_lines_of_undefined_speakers(nlp, segment, book_speeches[(chapter.number, segment.number)])
         #     speeches = parse_speech_in_segment(nlp, segment)
         #     speech_content += speech_to_text(speeches, None)
         #
@@ -77,8 +79,9 @@ def stanza_speech():
                     print(quote.speaker + ":" + quote.text)
 
 
-def analyse_lines_of_undefined_speakers(nlp, segment):
-    in_segment = parse_speech_in_segment(nlp, segment)
+def analyse_lines_of_undefined_speakers(nlp, segment, in_segment=None):
+    if in_segment is None:
+        in_segment = parse_speech_in_segment(nlp, segment)
     for s in in_segment:
         if s.speaker == 'N/A':
             if s.line_num > 0:
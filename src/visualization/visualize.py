@@ -6,11 +6,23 @@ import pandas as pd
 from wordcloud import WordCloud, ImageColorGenerator
 
 from src.common import constants
-from src.nlp.util import STOPWORDS
+from src.nlp.util import cached_stopwords
 from src.visualization.color import expanse_cmap, expanse_colors
 from src.visualization.image import text_to_image
 
-plt.style.use(constants.EXTERNAL_DATA_DIR / "mpl/expanse.mplstyle")
+_STYLE_USED = False
+
+
+def use_style():
+    """
+    Applies the expanse matplotlib style (only once).
+    """
+    global _STYLE_USED
+    if not _STYLE_USED:
+        plt.style.use(constants.EXTERNAL_DATA_DIR / "mpl/expanse.mplstyle")
+        _STYLE_USED = True
+
+
 # WIDTH = 170 * constants.MM_TO_INCH
 # HEIGHT = WIDTH / constants.PHI
 
@@ -25,6 +37,7 @@ def scatter_plot(num: int, book: str, x_axis: tuple, y_axis: tuple, col_bar: tup
     :param y_axis: tuple(title, values) for y-axis
     :param col_bar: tuple(title, values) for color bar
     """
+    use_style()
     scatter_plt = plt.scatter(x=x_axis[1], y=y_axis[1], s=500, alpha=0.55,
                               c=col_bar[1], cmap=expanse_cmap(n=10, mode='hls'), vmin=0, vmax=1,
                               clip_on=False,
@@ -94,6 +107,7 @@ def plot_grouped_bars(num: int, book: str, figure_title: str, first: tuple, seco
     :param first: tuple with bar name and list of values for first bar
     :param second: tuple with bar name and list of values for second bar
     """
+    use_style()
     plt.figure()
     axis = plt.gca()
 
@@ -137,14 +151,15 @@ def word_cloud(num, book_title):
     :param num: book number
     :param book_title: book title
     """
+    use_style()
     from src.common import load_book
 
-    book = load_book(book_title)
+    book = load_book(book_title, lazy=True)
     pov_characters = {pov.ref_name for pov in book.pov_characters()}
     for pov in pov_characters:
         LOGGER.info('Generate wordcloud for %s ...', pov)
         words = ' '.join([chapter.content() for chapter in book.chapters_by_pov(pov)])
-        stopwords_exclude_own_name = STOPWORDS.copy()
+        stopwords_exclude_own_name = cached_stopwords().copy()
         stopwords_exclude_own_name.add(pov)
         img = text_to_image(book_title, pov, 650)  # make an image out of the characters name
         wc_mask = np.array(img)